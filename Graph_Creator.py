@@ -1,9 +1,9 @@
 import streamlit as st
-from io import StringIO
-import pandas as pd
 import numpy as np
 from backend.graphs import DataAnalyzer, order
-from backend.default_orders import check_if_order_is_known
+from backend.default_orders import check_if_order_is_known, OrderLibrary, default_library
+from backend.loader import read_survey
+from backend.figure_cache import figure_cache
 
 
 class GraphParams:
@@ -72,25 +72,18 @@ st.write("This tool will help you to create various graphs 📉")
 st.sidebar.header("Graph Parameters")
 uploaded_file = st.sidebar.file_uploader("Upload dataframe", type='csv')
 multilevel_columns = st.sidebar.checkbox("Dataframe contains multilevel columns:", value=False)
+orders_file = st.sidebar.file_uploader("Upload your own answer orders (optional)", type=['json', 'yaml', 'yml'])
+order_library = None
+if orders_file is not None:
+    try:
+        order_library = OrderLibrary.from_file(orders_file)
+    except ValueError as error:
+        st.sidebar.error(str(error))
+categorical = st.sidebar.checkbox("Store answers as categories (faster for large surveys)", value=False)
 
 if uploaded_file is not None:
-    # To read file as bytes:
-    bytes_data = uploaded_file.getvalue()
-
-    # To convert to a string based IO:
-    stringio = StringIO(uploaded_file.getvalue().decode("utf-8"))
-
-    # To read file as string:
-    string_data = stringio.read()
-
-    # Can be used wherever a "file-like" object is accepted:
-    if multilevel_columns:
-        dataframe = pd.read_csv(uploaded_file, header=[0, 1])
-        dataframe.columns.set_levels(dataframe.columns.levels[0].str.strip(), level=0, inplace=True)
-        dataframe.columns.set_levels(dataframe.columns.levels[1].str.strip(), level=1, inplace=True)
-    else:
-        dataframe = pd.read_csv(uploaded_file)
-        dataframe.columns = dataframe.columns.str.strip()
+    dataframe = read_survey(uploaded_file, multilevel_columns=multilevel_columns, categorical=categorical,
+                            orders=order_library or default_library)
     st.header("Inputed Dataframe:")
     st.dataframe(dataframe)
 
@@ -107,8 +100,8 @@ if uploaded_file is not None:
         with st.sidebar:
             save = st.checkbox('Save the order')
             if not save:
-                unique_vals = [x for x in list(dataframe[column].unique())[1:] if str(x) != 'nan']
-                ord = check_if_order_is_known(unique_vals)
+                unique_vals = graph_creator.unique_answers([column])
+                ord = check_if_order_is_known(unique_vals, order_library)
                 if ord is None:
                     ord = sorted(unique_vals)
                 order = st.text_area('Select the order for the options:',
@@ -130,10 +123,7 @@ if uploaded_file is not None:
 
             set_y_range = st.checkbox('Select to set y-axis range', value=False)
             if set_y_range:
-                if percents:
-                    df_temp = pd.DataFrame(dataframe.loc[1:, column].value_counts(normalize=True))
-                else:
-                    df_temp = pd.DataFrame(dataframe.loc[1:, column].value_counts())
+                df_temp = graph_creator.response_frequencies([column], normalize=percents)
                 minimum = df_temp[column].min()
                 maximum = df_temp[column].max()
 
@@ -149,20 +139,21 @@ if uploaded_file is not None:
             else:
                 y_range = None
                 tick_distance = None
-            gp = graph_params(1500, 780, 27, False, dataframe.loc[0, column], True,
+            gp = graph_params(1500, 780, 27, False, graph_creator.questions[column], True,
                               'The default options for this graph is: \n'
                               'rectangular - 1550x820 with 29 font, \n'
                               'square - 1200x900 with 27 font')
         if column:
             st.header('Resulting Graph')
-            graph_for_plot = graph_creator.create_bar_graph(column, width=gp.width, height=gp.height,
-                                                            font_size=gp.font_size, font=gp.font,
-                                                            order=order, one_color=one_color,
-                                                            x_title=gp.x_title, y_title=gp.y_title,
-                                                            title=gp.title, title_text=gp.title_text,
-                                                            max_symb=gp.max_symbols, transparent=gp.transparent,
-                                                            percents=percents, bar_gap=bar_gap,
-                                                            y_range=y_range, tick_distance=tick_distance)
+            graph_for_plot = figure_cache.build(graph_creator.create_bar_graph, column,
+                                                width=gp.width, height=gp.height,
+                                                font_size=gp.font_size, font=gp.font,
+                                                order=order, one_color=one_color,
+                                                x_title=gp.x_title, y_title=gp.y_title,
+                                                title=gp.title, title_text=gp.title_text,
+                                                max_symb=gp.max_symbols, transparent=gp.transparent,
+                                                percents=percents, bar_gap=bar_gap,
+                                                y_range=y_range, tick_distance=tick_distance)
             st.plotly_chart(graph_for_plot)
 
     elif option == 'Group Bar Graph':
@@ -186,13 +177,10 @@ if uploaded_file is not None:
             if columns:
                 if not save:
                     if not multilevel_columns:
-                        options = []
-                        for col in columns:
-                            options.extend(list(dataframe[col].unique())[1:])
-                        options = sorted([x for x in list(set(options)) if str(x) != 'nan'])
+                        options = sorted(graph_creator.unique_answers(columns))
                     else:
                         options = sorted([col.strip() for col in dataframe[columns].columns])
-                    ord = check_if_order_is_known(options)
+                    ord = check_if_order_is_known(options, order_library)
                     if ord is not None:
                         options = ord
                     order = st.text_area('Select the order for the options:',
@@ -239,18 +227,19 @@ if uploaded_file is not None:
         if columns:
             st.header('Resulting Graph')
 
-            graph_for_plot = graph_creator.create_bar_graph_group(columns, width=gp.width, height=gp.height,
-                                                                  font_size=gp.font_size, font=gp.font,
-                                                                  order=order, x_title=gp.x_title, y_title=gp.y_title,
-                                                                  title=gp.title, title_text=gp.title_text,
-                                                                  max_symb=gp.max_symbols,
-                                                                  legend_position=gp.legend_position,
-                                                                  transparent=gp.transparent, remove=remove,
-                                                                  multilevel_columns=multilevel_columns,
-                                                                  course_col=course_column, percents=percents,
-                                                                  bar_gap=bar_gap, bar_group_gap=bar_group_gap,
-                                                                  y_range=y_range, tick_distance=tick_distance,
-                                                                  reverse_legend_order=reverse_legend_order)
+            graph_for_plot = figure_cache.build(graph_creator.create_bar_graph_group, columns,
+                                                width=gp.width, height=gp.height,
+                                                font_size=gp.font_size, font=gp.font,
+                                                order=order, x_title=gp.x_title, y_title=gp.y_title,
+                                                title=gp.title, title_text=gp.title_text,
+                                                max_symb=gp.max_symbols,
+                                                legend_position=gp.legend_position,
+                                                transparent=gp.transparent, remove=remove,
+                                                multilevel_columns=multilevel_columns,
+                                                course_col=course_column, percents=percents,
+                                                bar_gap=bar_gap, bar_group_gap=bar_group_gap,
+                                                y_range=y_range, tick_distance=tick_distance,
+                                                reverse_legend_order=reverse_legend_order)
             st.plotly_chart(graph_for_plot)
 
     elif option == 'Multiple-Choice Question Bar Graph':
@@ -259,7 +248,7 @@ if uploaded_file is not None:
             save = st.checkbox('Save the order')
             if not save:
                 unique_vals = list(graph_creator.get_categories_from_columns(column, ',(\S)')['index'])
-                ord = check_if_order_is_known(unique_vals)
+                ord = check_if_order_is_known(unique_vals, order_library)
                 if ord is None:
                     ord = sorted(unique_vals)
                 order = st.text_area('Select the order for the options:',
@@ -270,16 +259,17 @@ if uploaded_file is not None:
                 order = st.text_area('Select the order for the options:',
                                      value=st.session_state.options, height=250)
 
-            gp = graph_params(900, 600, 20, False, dataframe.loc[0, column], True)
+            gp = graph_params(900, 600, 20, False, graph_creator.questions[column], True)
         if column:
             st.header('Resulting Graph')
-            graph_for_plot = graph_creator.create_chart_for_categories(column, width=gp.width, height=gp.height,
-                                                                       font_size=gp.font_size, font=gp.font,
-                                                                       order=order, one_color=True,
-                                                                       x_title=gp.x_title, y_title=gp.y_title,
-                                                                       title=gp.title, title_text=gp.title_text,
-                                                                       max_symb=gp.max_symbols,
-                                                                       transparent=gp.transparent)
+            graph_for_plot = figure_cache.build(graph_creator.create_chart_for_categories, column,
+                                                width=gp.width, height=gp.height,
+                                                font_size=gp.font_size, font=gp.font,
+                                                order=order, one_color=True,
+                                                x_title=gp.x_title, y_title=gp.y_title,
+                                                title=gp.title, title_text=gp.title_text,
+                                                max_symb=gp.max_symbols,
+                                                transparent=gp.transparent)
             st.plotly_chart(graph_for_plot)
 
     elif option == 'Pie Chart':
@@ -294,7 +284,7 @@ if uploaded_file is not None:
                 save = st.checkbox('Save the order')
                 if not save:
                     unique_vals = list(graph_creator.get_categories_from_columns(column, ',(\S)')['index'])
-                    ord = check_if_order_is_known(unique_vals)
+                    ord = check_if_order_is_known(unique_vals, order_library)
                     if ord is None:
                         ord = sorted(unique_vals)
                     order = st.text_area('Select the order for the options:',
@@ -305,7 +295,7 @@ if uploaded_file is not None:
                     order = st.text_area('Select the order for the options:',
                                          value=st.session_state.options, height=250)
             with st.sidebar:
-                gp = graph_params(900, 600, 25, True, dataframe.loc[0, column], False)
+                gp = graph_params(900, 600, 25, True, graph_creator.questions[column], False)
 
         else:
             column = None
@@ -316,7 +306,7 @@ if uploaded_file is not None:
                 save = st.checkbox('Save the order')
                 if not save:
                     unique_vals = list(graph_creator.get_categories_from_columns(label_column, ',(\S)')['index'])
-                    ord = check_if_order_is_known(unique_vals)
+                    ord = check_if_order_is_known(unique_vals, order_library)
                     if ord is None:
                         ord = sorted(unique_vals)
                     order = st.text_area('Select the order for the options:',
@@ -327,26 +317,27 @@ if uploaded_file is not None:
                     order = st.text_area('Select the order for the options:',
                                          value=st.session_state.options, height=250)
             with st.sidebar:
-                gp = graph_params(900, 600, 25, True, dataframe.loc[0, label_column], False)
+                gp = graph_params(900, 600, 25, True, graph_creator.questions[label_column], False)
 
         if column or label_column:
             st.header('Resulting Graph')
             if from_column:
-                graph_for_plot = graph_creator.create_pie_chart(column=column, width=gp.width, height=gp.height,
-                                                                font_size=gp.font_size, font=gp.font,
-                                                                x_title=gp.x_title, y_title=gp.y_title,
-                                                                title=gp.title, title_text=gp.title_text,
-                                                                what_show=what_show, legend_position=gp.legend_position,
-                                                                transparent=gp.transparent, order=order)
+                graph_for_plot = figure_cache.build(graph_creator.create_pie_chart, column=column,
+                                                    width=gp.width, height=gp.height,
+                                                    font_size=gp.font_size, font=gp.font,
+                                                    x_title=gp.x_title, y_title=gp.y_title,
+                                                    title=gp.title, title_text=gp.title_text,
+                                                    what_show=what_show, legend_position=gp.legend_position,
+                                                    transparent=gp.transparent, order=order)
             else:
-                graph_for_plot = graph_creator.create_pie_chart(label_column=label_column,
-                                                                numbers_column=numbers_column,
-                                                                width=gp.width, height=gp.height,
-                                                                font_size=gp.font_size, font=gp.font,
-                                                                x_title=gp.x_title, y_title=gp.y_title,
-                                                                title=gp.title, title_text=gp.title_text,
-                                                                what_show=what_show, legend_position=gp.legend_position,
-                                                                transparent=gp.transparent, order=order)
+                graph_for_plot = figure_cache.build(graph_creator.create_pie_chart, label_column=label_column,
+                                                    numbers_column=numbers_column,
+                                                    width=gp.width, height=gp.height,
+                                                    font_size=gp.font_size, font=gp.font,
+                                                    x_title=gp.x_title, y_title=gp.y_title,
+                                                    title=gp.title, title_text=gp.title_text,
+                                                    what_show=what_show, legend_position=gp.legend_position,
+                                                    transparent=gp.transparent, order=order)
             st.plotly_chart(graph_for_plot)
 
     elif option == 'Gauge Graph':
@@ -361,8 +352,8 @@ if uploaded_file is not None:
 
         if column:
             st.header('Resulting Graph')
-            graph_for_plot = graph_creator.create_gauge_graph(column, width=width, height=height,
-                                                              font_size=font_size, font=font, transparent=transparent)
+            graph_for_plot = figure_cache.build(graph_creator.create_gauge_graph, column, width=width, height=height,
+                                                font_size=font_size, font=font, transparent=transparent)
             st.plotly_chart(graph_for_plot)
 
     elif option == 'Horizontal Bar Graph for single NPS score':
@@ -381,9 +372,10 @@ if uploaded_file is not None:
 
         if column:
             st.header('Resulting Graph')
-            graph_for_plot = graph_creator.create_horizontal_bar_graph(column, width=width, height=height,
-                                                                       font_size=font_size, font=font,
-                                                                       transparent=transparent, order=order)
+            graph_for_plot = figure_cache.build(graph_creator.create_horizontal_bar_graph, column,
+                                                width=width, height=height,
+                                                font_size=font_size, font=font,
+                                                transparent=transparent, order=order)
             st.plotly_chart(graph_for_plot)
 
     elif option == 'Bar Graph for Numeric Data':
@@ -394,7 +386,7 @@ if uploaded_file is not None:
             save = st.checkbox('Save the order')
             if not save:
                 unique_vals = [x for x in list(dataframe[column].unique()) if str(x) != 'nan']
-                ord = check_if_order_is_known(unique_vals)
+                ord = check_if_order_is_known(unique_vals, order_library)
                 if ord is None:
                     ord = sorted(unique_vals)
                 order = st.text_area('Select the order for the options:',
@@ -439,28 +431,28 @@ if uploaded_file is not None:
                                           value=0.7)
             else:
                 bar_gap = None
-            gp = graph_params(1500, 780, 27, False, dataframe.loc[0, column], True,
+            gp = graph_params(1500, 780, 27, False, graph_creator.questions[column], True,
                               'The default options for this graph is: \n'
                               'rectangular - 1550x820 with 29 font, \n'
                               'square - 1200x900 with 27 font', show_inside_outside=True)
         if column:
             st.header('Resulting Graph')
-            graph_for_plot = graph_creator.create_simple_bar(course_col=column, column=data_column,
-                                                             width=gp.width, height=gp.height,
-                                                             font_size=gp.font_size, font=gp.font,
-                                                             order=order, one_color=True,
-                                                             x_title=gp.x_title, y_title=gp.y_title,
-                                                             title=gp.title, title_text=gp.title_text,
-                                                             max_symb=gp.max_symbols, transparent=gp.transparent,
-                                                             percents=percents, show_average=show_average,
-                                                             avg_line_title='',
-                                                             inside_outside_pos=gp.inside_outside,
-                                                             round_nums=round_nums,
-                                                             average_line_x=average_line_x,
-                                                             err_column=err_column,
-                                                             y_range=y_range, tick_distance=tick_distance,
-                                                             bar_gap=bar_gap
-                                                             )
+            graph_for_plot = figure_cache.build(graph_creator.create_simple_bar, course_col=column, column=data_column,
+                                                width=gp.width, height=gp.height,
+                                                font_size=gp.font_size, font=gp.font,
+                                                order=order, one_color=True,
+                                                x_title=gp.x_title, y_title=gp.y_title,
+                                                title=gp.title, title_text=gp.title_text,
+                                                max_symb=gp.max_symbols, transparent=gp.transparent,
+                                                percents=percents, show_average=show_average,
+                                                avg_line_title='',
+                                                inside_outside_pos=gp.inside_outside,
+                                                round_nums=round_nums,
+                                                average_line_x=average_line_x,
+                                                err_column=err_column,
+                                                y_range=y_range, tick_distance=tick_distance,
+                                                bar_gap=bar_gap
+                                                )
             st.plotly_chart(graph_for_plot)
 
     elif option == 'Horizontal Bar Chart for multiple NPS scores':
@@ -470,21 +462,22 @@ if uploaded_file is not None:
             round_nums = st.number_input('Rounding of Inputs', min_value=1, max_value=10, step=1, value=2)
             percents = st.checkbox('Show percents on graph (if not checked, absolute values will be shown)',
                                    value=True)
-            gp = graph_params(1500, 780, 27, False, dataframe.loc[0, column], True,
+            gp = graph_params(1500, 780, 27, False, graph_creator.questions[column], True,
                               'The default options for this graph is: \n'
                               'rectangular - 1550x820 with 29 font, \n'
                               'square - 1200x900 with 27 font')
         if column:
             st.header('Resulting Graph')
-            graph_for_plot = graph_creator.plot_horizontal_bar_for_nps(course_col=column, column=data_column,
-                                                                       width=gp.width, height=gp.height,
-                                                                       font_size=gp.font_size, font=gp.font,
-                                                                       x_title=gp.x_title, y_title=gp.y_title,
-                                                                       title=gp.title, title_text=gp.title_text,
-                                                                       max_symb=gp.max_symbols,
-                                                                       transparent=gp.transparent,
-                                                                       percents=percents,
-                                                                       round_nums=round_nums)
+            graph_for_plot = figure_cache.build(graph_creator.plot_horizontal_bar_for_nps, course_col=column,
+                                                column=data_column,
+                                                width=gp.width, height=gp.height,
+                                                font_size=gp.font_size, font=gp.font,
+                                                x_title=gp.x_title, y_title=gp.y_title,
+                                                title=gp.title, title_text=gp.title_text,
+                                                max_symb=gp.max_symbols,
+                                                transparent=gp.transparent,
+                                                percents=percents,
+                                                round_nums=round_nums)
             st.plotly_chart(graph_for_plot)
 
     elif option == 'Self-Assessment Graph':
@@ -519,17 +512,17 @@ if uploaded_file is not None:
             coordinate_of_legend_y = st.text_input('Coordinate of legend\'s y', value='-0.3')
         if time_column:
             st.header('Resulting Graph')
-            graph_for_plot = graph_creator.plot_self_assessment(time_col=time_column,
-                                                                width=gp.width, height=gp.height,
-                                                                font_size=gp.font_size, font=gp.font,
-                                                                x_title=gp.x_title, y_title=gp.y_title,
-                                                                title=gp.title, title_text=gp.title_text,
-                                                                max_symb=gp.max_symbols,
-                                                                transparent=gp.transparent,
-                                                                round_nums=round_nums,
-                                                                legend_y_coord=coordinate_of_legend_y,
-                                                                y_range=y_range, tick_distance=tick_distance,
-                                                                bar_gap=bar_gap)
+            graph_for_plot = figure_cache.build(graph_creator.plot_self_assessment, time_col=time_column,
+                                                width=gp.width, height=gp.height,
+                                                font_size=gp.font_size, font=gp.font,
+                                                x_title=gp.x_title, y_title=gp.y_title,
+                                                title=gp.title, title_text=gp.title_text,
+                                                max_symb=gp.max_symbols,
+                                                transparent=gp.transparent,
+                                                round_nums=round_nums,
+                                                legend_y_coord=coordinate_of_legend_y,
+                                                y_range=y_range, tick_distance=tick_distance,
+                                                bar_gap=bar_gap)
             st.plotly_chart(graph_for_plot)
 
     elif option == 'Line Graph':
@@ -552,19 +545,22 @@ if uploaded_file is not None:
                 y_range = None
                 tick_distance = None
             show_average = st.checkbox('Select to show average line')
+            resample = {'No': None, 'Day': 'D', 'Week': 'W', 'Month': 'M'}[
+                st.selectbox('Average the values per:', ('No', 'Day', 'Week', 'Month'))]
             gp = graph_params(900, 550, 20, False, 'Learning Outcomes Scores Timeline', True,
                               'The default options for this graph is: \n'
                               'rectangular - 1550x820 with 29 font, \n'
                               'square - 1200x900 with 27 font')
         if time_column:
             st.header('Resulting Graph')
-            graph_for_plot = graph_creator.plot_line(time_col=time_column,
-                                                     width=gp.width, height=gp.height,
-                                                     font_size=gp.font_size, font=gp.font,
-                                                     x_title=gp.x_title, y_title=gp.y_title,
-                                                     title=gp.title, title_text=gp.title_text,
-                                                     transparent=gp.transparent, y_range=y_range,
-                                                     tick_distance=tick_distance, show_average=show_average)
+            graph_for_plot = figure_cache.build(graph_creator.plot_line, time_col=time_column,
+                                                width=gp.width, height=gp.height,
+                                                font_size=gp.font_size, font=gp.font,
+                                                x_title=gp.x_title, y_title=gp.y_title,
+                                                title=gp.title, title_text=gp.title_text,
+                                                transparent=gp.transparent, y_range=y_range,
+                                                tick_distance=tick_distance, show_average=show_average,
+                                                resample=resample)
             st.plotly_chart(graph_for_plot)
 
     elif option == 'Horizontal Bar Chart for NPS scores':
@@ -574,21 +570,22 @@ if uploaded_file is not None:
             round_nums = st.number_input('Rounding of Inputs', min_value=1, max_value=10, step=1, value=2)
             percents = st.checkbox('Show percents on graph (if not checked, absolute values will be shown)',
                                    value=True)
-            gp = graph_params(1500, 780, 27, False, dataframe.loc[0, column], True,
+            gp = graph_params(1500, 780, 27, False, graph_creator.questions[column], True,
                               'The default options for this graph is: \n'
                               'rectangular - 1550x820 with 29 font, \n'
                               'square - 1200x900 with 27 font')
         if column:
             st.header('Resulting Graph')
-            graph_for_plot = graph_creator.plot_horizontal_bar_for_nps(course_col=column, column=data_column,
-                                                                       width=gp.width, height=gp.height,
-                                                                       font_size=gp.font_size, font=gp.font,
-                                                                       x_title=gp.x_title, y_title=gp.y_title,
-                                                                       title=gp.title, title_text=gp.title_text,
-                                                                       max_symb=gp.max_symbols,
-                                                                       transparent=gp.transparent,
-                                                                       percents=percents,
-                                                                       round_nums=round_nums)
+            graph_for_plot = figure_cache.build(graph_creator.plot_horizontal_bar_for_nps, course_col=column,
+                                                column=data_column,
+                                                width=gp.width, height=gp.height,
+                                                font_size=gp.font_size, font=gp.font,
+                                                x_title=gp.x_title, y_title=gp.y_title,
+                                                title=gp.title, title_text=gp.title_text,
+                                                max_symb=gp.max_symbols,
+                                                transparent=gp.transparent,
+                                                percents=percents,
+                                                round_nums=round_nums)
             st.plotly_chart(graph_for_plot)
 
     elif option == 'Stacked Bar Graph':
@@ -599,21 +596,21 @@ if uploaded_file is not None:
         with st.sidebar:
             percents = st.checkbox('Show percents on graph (if not checked, absolute values will be shown)',
                                    value=True)
-            gp = graph_params(1500, 780, 27, True, dataframe.loc[0, column], True,
+            gp = graph_params(1500, 780, 27, True, graph_creator.questions[column], True,
                               'The default options for this graph is: \n'
                               'rectangular - 1550x820 with 29 font, \n'
                               'square - 1200x900 with 27 font')
         if column:
             st.header('Resulting Graph')
-            graph_for_plot = graph_creator.stacked_bar_plot(column, first_column, second_column,
-                                                            width=gp.width, height=gp.height,
-                                                            font_size=gp.font_size, font=gp.font,
-                                                            x_title=gp.x_title, y_title=gp.y_title,
-                                                            title=gp.title, title_text=gp.title_text,
-                                                            transparent=gp.transparent,
-                                                            percents=percents,
-                                                            max_symb=gp.max_symbols,
-                                                            legend_position=gp.legend_position)
+            graph_for_plot = figure_cache.build(graph_creator.stacked_bar_plot, column, first_column, second_column,
+                                                width=gp.width, height=gp.height,
+                                                font_size=gp.font_size, font=gp.font,
+                                                x_title=gp.x_title, y_title=gp.y_title,
+                                                title=gp.title, title_text=gp.title_text,
+                                                transparent=gp.transparent,
+                                                percents=percents,
+                                                max_symb=gp.max_symbols,
+                                                legend_position=gp.legend_position)
             st.plotly_chart(graph_for_plot)
 
     elif option == 'Scatter Graph with Regression Line':
@@ -623,34 +620,34 @@ if uploaded_file is not None:
         with st.sidebar:
             marker_size = st.number_input('Marker size:', 1, 40, 10, 1)
             marker_border_width = st.number_input('Marker border width:', 1, 20, 2, 1)
-            gp = graph_params(1500, 780, 27, False, dataframe.loc[0, first_column], True,
+            gp = graph_params(1500, 780, 27, False, graph_creator.questions[first_column], True,
                               'The default options for this graph is: \n'
                               'rectangular - 1550x820 with 29 font, \n'
                               'square - 1200x900 with 27 font')
         if first_column and second_column:
             st.header('Resulting Graph')
-            graph_for_plot = graph_creator.plot_scatter_with_regression(first_column, second_column,
-                                                                        width=gp.width, height=gp.height,
-                                                                        font_size=gp.font_size, font=gp.font,
-                                                                        x_title=gp.x_title, y_title=gp.y_title,
-                                                                        title=gp.title, title_text=gp.title_text,
-                                                                        transparent=gp.transparent,
-                                                                        marker_size=marker_size,
-                                                                        marker_line_width=marker_border_width)
+            graph_for_plot = figure_cache.build(graph_creator.plot_scatter_with_regression, first_column, second_column,
+                                                width=gp.width, height=gp.height,
+                                                font_size=gp.font_size, font=gp.font,
+                                                x_title=gp.x_title, y_title=gp.y_title,
+                                                title=gp.title, title_text=gp.title_text,
+                                                transparent=gp.transparent,
+                                                marker_size=marker_size,
+                                                marker_line_width=marker_border_width)
             st.plotly_chart(graph_for_plot)
 
     elif option == 'Histogram':
         column = st.sidebar.selectbox('Select column to create graph for:', tuple(dataframe.columns))
         with st.sidebar:
-            gp = graph_params(1200, 600, 27, False, dataframe.loc[0, column], False,
+            gp = graph_params(1200, 600, 27, False, graph_creator.questions[column], False,
                               'The default options for this graph is: \n'
                               'rectangular - 1550x820 with 29 font, \n'
                               'square - 1200x900 with 27 font')
         if column:
             st.header('Resulting Graph')
-            graph_for_plot = graph_creator.plot_histogram(column, width=gp.width, height=gp.height,
-                                                          font_size=gp.font_size, font=gp.font,
-                                                          x_title=gp.x_title, y_title=gp.y_title,
-                                                          title=gp.title, title_text=gp.title_text,
-                                                          transparent=gp.transparent)
+            graph_for_plot = figure_cache.build(graph_creator.plot_histogram, column, width=gp.width, height=gp.height,
+                                                font_size=gp.font_size, font=gp.font,
+                                                x_title=gp.x_title, y_title=gp.y_title,
+                                                title=gp.title, title_text=gp.title_text,
+                                                transparent=gp.transparent)
             st.plotly_chart(graph_for_plot)
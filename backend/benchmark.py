@@ -0,0 +1,165 @@
+import argparse
+import gc
+import os
+import resource
+import sys
+import time
+from multiprocessing import get_context
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+import plotly.graph_objects as go
+
+from backend.graphs import DataAnalyzer, chart_template
+
+ANSWERS = ['Strongly disagree', 'Disagree', 'Neutral', 'Agree', 'Strongly agree']
+
+# chart name: (kind of frame, builder, arguments)
+MEMORY_CHARTS = {
+    'create_simple_bar': ('courses', 'create_simple_bar',
+                          dict(avg_line_title='Average', average_line_x='Course 0', course_col='course',
+                               column='score', order=',\n'.join(f'Course {i}' for i in range(10)))),
+    'plot_horizontal_bar_for_nps': ('courses', 'plot_horizontal_bar_for_nps',
+                                    dict(course_col='course', column='score')),
+    'create_bar_graph': ('survey', 'create_bar_graph', dict(column='Q0', order=',\n'.join(ANSWERS))),
+    'create_bar_graph_group': ('survey', 'create_bar_graph_group',
+                               dict(columns=['Q0', 'Q1', 'Q2'], order=',\n'.join(ANSWERS))),
+}
+
+
+def survey_columns(rows: int, columns: int) -> dict:
+    # a wide export: question row followed by Likert answers stored as python strings
+    rng = np.random.default_rng(0)
+    answers = np.array(ANSWERS, dtype=object)
+    return {f'Q{column}': np.concatenate([[f'Question {column} - part {column}'], rng.choice(answers, size=rows)])
+            for column in range(columns)}
+
+
+def survey_frame(rows: int, columns: int) -> pd.DataFrame:
+    return pd.DataFrame(survey_columns(rows, columns))
+
+
+def course_frame(rows: int, columns: int) -> pd.DataFrame:
+    # an aggregate table with one row per course next to many other text columns, built in one go so it is
+    # consolidated like a frame parsed by read_csv
+    return pd.DataFrame({'course': [f'Course {i % 10}' if i < 10 else f'Section {i}' for i in range(rows + 1)],
+                         'score': np.random.default_rng(1).random(rows + 1),
+                         **survey_columns(rows, columns)})
+
+
+def current_rss() -> int:
+    with open('/proc/self/statm') as file:
+        return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def peak_rss() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def reset_peak_rss() -> bool:
+    # linux lets a process reset its peak resident set size, elsewhere the peak of the whole run is reported
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def measure_chart(name: str, rows: int, columns: int) -> dict:
+    kind, method, arguments = MEMORY_CHARTS[name]
+    frame = survey_frame if kind == 'survey' else course_frame
+    # a first call on a small frame loads plotly's validators, which would otherwise count as the chart's memory
+    getattr(DataAnalyzer(frame(20, 3)), method)(**arguments)
+    df = frame(rows, columns)
+    analyzer = DataAnalyzer(df)
+    gc.collect()
+    reset = reset_peak_rss()
+    before = current_rss()
+    start = time.perf_counter()
+    getattr(analyzer, method)(**arguments)
+    seconds = time.perf_counter() - start
+    return dict(chart=name, seconds=seconds, frame_mb=df.memory_usage(deep=True).sum() / 1024 ** 2,
+                peak_mb=(peak_rss() - before) / 1024 ** 2 if reset else peak_rss() / 1024 ** 2)
+
+
+def memory_benchmark(charts: List[str], rows: int, columns: int) -> List[dict]:
+    # every chart runs in a fresh process, so the peak of one call is not hidden by an earlier one
+    results = []
+    with get_context('spawn').Pool(processes=1, maxtasksperchild=1) as pool:
+        for name in charts:
+            results.append(pool.apply(measure_chart, (name, rows, columns)))
+    return results
+
+
+def legacy_style(fig: go.Figure, font: str, font_size: int, transparent: bool):
+    # the update_layout, update_xaxes and update_yaxes calls the charts made before chart_template
+    fig.update_layout(font_family=font, font_size=font_size, title_font_family=font, title_font_size=font_size * 1.5,
+                      xaxis=dict(titlefont_size=font_size, tickfont_size=font_size),
+                      yaxis=dict(titlefont_size=font_size, tickfont_size=font_size),
+                      legend=dict(font_size=font_size, font_family=font))
+    if transparent:
+        fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+    else:
+        fig.update_layout(plot_bgcolor='rgb(255,255,255)')
+    fig.update_xaxes(showline=True, linewidth=1, linecolor='black')
+    fig.update_yaxes(showline=True, linewidth=1, linecolor='black')
+    fig.update_yaxes(showgrid=False, gridwidth=1, gridcolor='lightgrey', automargin=True)
+    fig.update_xaxes(tickangle=0, automargin=True)
+
+
+def time_call(function, repeats: int) -> float:
+    # best of the repeats, after one call that fills the caches
+    function()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def figure_benchmark(questions_num: int, repeats: int) -> List[dict]:
+    # figure construction of a multi-trace chart: styling calls against the cached template, and the grouped
+    # bar chart built as graph_objects against plain dicts
+    order = ',\n'.join(ANSWERS)
+    questions = [f'Q{column}' for column in range(questions_num)]
+    df = survey_frame(200, questions_num)
+    traces = [go.Bar(x=questions, y=np.arange(questions_num), name=answer) for answer in ANSWERS]
+    cases = {
+        'style: update calls': lambda: legacy_style(go.Figure(data=traces), 'Arial', 20, False),
+        'style: cached template': lambda: go.Figure(data=traces).update_layout(
+            template=chart_template('Arial', 20, False)),
+        'group bar: graph_objects': lambda: DataAnalyzer(df).create_bar_graph_group(questions, order=order),
+        'group bar: plain dict': lambda: DataAnalyzer(df, plain_figures=True).create_bar_graph_group(questions,
+                                                                                                     order=order),
+    }
+    return [dict(case=case, ms=time_call(function, repeats) * 1000) for case, function in cases.items()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Measure the peak memory each chart call adds on a wide export, '
+                                                 'or with --figures the time spent building figures.')
+    parser.add_argument('--rows', type=int, default=2000, help='answers per column')
+    parser.add_argument('--columns', type=int, default=2000, help='number of survey columns')
+    parser.add_argument('--charts', nargs='+', default=list(MEMORY_CHARTS), choices=list(MEMORY_CHARTS))
+    parser.add_argument('--figures', action='store_true', help='time figure construction instead')
+    parser.add_argument('--questions', type=int, default=8, help='bars per trace with --figures')
+    parser.add_argument('--repeats', type=int, default=20, help='calls timed per case with --figures')
+    args = parser.parse_args(argv)
+    if args.figures:
+        print(f'{"case":<30}{"ms":>10}')
+        for result in figure_benchmark(args.questions, args.repeats):
+            print(f'{result["case"]:<30}{result["ms"]:>10.2f}')
+        return 0
+    print(f'{"chart":<30}{"frame MB":>10}{"peak MB":>10}{"seconds":>10}')
+    for result in memory_benchmark(args.charts, args.rows, args.columns):
+        print(f'{result["chart"]:<30}{result["frame_mb"]:>10.1f}{result["peak_mb"]:>10.1f}{result["seconds"]:>10.3f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import json
+import os
+from typing import List, Optional
+
+import pandas as pd
+
+DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'graph_creator', 'surveys')
+
+
+class SurveyStore:
+    # uploads converted once to uncompressed Feather files, so single columns can be memory-mapped later
+
+    def __init__(self, directory: str = DEFAULT_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f'{key}{suffix}')
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self.path(key, '.feather')) and os.path.exists(self.path(key, '.json'))
+
+    def convert(self, key: str, df: pd.DataFrame):
+        # row 0 with the question text goes to a json file next to the answers
+        from pyarrow import feather
+        metadata = {'columns': [list(column) if isinstance(column, tuple) else column for column in df.columns],
+                    'multilevel': isinstance(df.columns, pd.MultiIndex),
+                    'questions': df.iloc[0].where(df.iloc[0].notna(), None).tolist() if len(df) else []}
+        answers = df.iloc[1:].reset_index(drop=True)
+        # feather only takes unique string column names, the labels are kept in the metadata instead
+        answers.columns = [str(position) for position in range(answers.shape[1])]
+        # read_csv parses big files in chunks and can leave ints next to strings in one column, arrow needs one type
+        for column in answers.columns[answers.dtypes == object]:
+            if pd.api.types.infer_dtype(answers[column], skipna=True).startswith('mixed'):
+                answers[column] = answers[column].where(answers[column].isna(), answers[column].astype(str))
+        # written under a temporary name first, so concurrent workers never read half a file
+        temporary = self.path(key, f'.{os.getpid()}.tmp')
+        feather.write_feather(answers, temporary, compression='uncompressed')
+        os.replace(temporary, self.path(key, '.feather'))
+        with open(temporary, 'w') as file:
+            json.dump(metadata, file, default=str)
+        os.replace(temporary, self.path(key, '.json'))
+
+    def metadata(self, key: str) -> dict:
+        with open(self.path(key, '.json')) as file:
+            metadata = json.load(file)
+        if metadata['multilevel']:
+            metadata['columns'] = [tuple(column) for column in metadata['columns']]
+        return metadata
+
+    def columns(self, key: str) -> pd.Index:
+        metadata = self.metadata(key)
+        if metadata['multilevel']:
+            return pd.MultiIndex.from_tuples(metadata['columns'])
+        return pd.Index(metadata['columns'])
+
+    def questions(self, key: str) -> dict:
+        metadata = self.metadata(key)
+        return dict(zip(metadata['columns'], metadata['questions']))
+
+    def load(self, key: str, columns: Optional[List] = None) -> pd.DataFrame:
+        # the same frame as the parsed csv, limited to the given columns
+        from pyarrow import feather
+        metadata = self.metadata(key)
+        labels = metadata['columns']
+        positions = range(len(labels)) if columns is None else [labels.index(column) for column in columns]
+        table = feather.read_table(self.path(key, '.feather'), columns=[str(position) for position in positions],
+                                   memory_map=True)
+        df = table.to_pandas()
+        # arrow gives None for missing strings, the parsed csv has NaN there
+        for column in df.columns[df.dtypes == object]:
+            df[column] = df[column].where(df[column].notna(), float('nan'))
+        if metadata['questions']:
+            questions = pd.DataFrame([[float('nan') if metadata['questions'][position] is None
+                                       else metadata['questions'][position] for position in positions]],
+                                     columns=df.columns).astype(df.dtypes.to_dict())
+            df = pd.concat([questions, df], ignore_index=True)
+        selected = [labels[position] for position in positions]
+        df.columns = pd.MultiIndex.from_tuples(selected) if metadata['multilevel'] else pd.Index(selected)
+        return df
+
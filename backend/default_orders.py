@@ -1,3 +1,8 @@
+import json
+from collections import defaultdict
+from typing import Iterable, Optional, Sequence, Tuple, Union, BinaryIO
+
+from backend.loader import read_bytes
 
 known_orders = (
     ('Yes', 'No'),
@@ -86,12 +91,82 @@ known_orders = (
     ('Extremely Dissatisfied', 'Dissatisfied', 'Somewhat satisfied', 'Satisfied', 'Extremely satisfied')
 )
 
-def check_if_order_is_known(order):
-    for possible_order in known_orders:
-        fit = True
-        for term in order:
-            if term not in possible_order:
-                fit = False
-                break
-        if fit:
-            return possible_order
+
+def normalize_label(label: str) -> str:
+    return ' '.join(label.split()).casefold()
+
+
+class OrderLibrary:
+    # inverted index from every answer label to the orders that contain it
+
+    def __init__(self, orders: Iterable[Sequence[str]] = ()):
+        self.orders = []
+        self.labels = []
+        self.index = defaultdict(set)
+        for possible_order in orders:
+            self.add(possible_order)
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def add(self, possible_order: Sequence[str]):
+        position = len(self.orders)
+        self.orders.append(tuple(possible_order))
+        self.labels.append(set(possible_order))
+        for label in possible_order:
+            self.index[normalize_label(label)].add(position)
+
+    def match(self, order: Iterable) -> Optional[Tuple[str, ...]]:
+        # first order containing every label, exact spelling first, then ignoring case and whitespace
+        order = list(dict.fromkeys(order))
+        if not all(isinstance(term, str) for term in order):
+            return None
+        if not order:
+            return self.orders[0] if self.orders else None
+        postings = sorted((self.index.get(normalize_label(term), set()) for term in order), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        if not candidates:
+            return None
+        candidates = sorted(candidates)
+        for position in candidates:
+            if self.labels[position].issuperset(order):
+                return self.orders[position]
+        # keep the spelling of the data, so the labels still match its answers
+        spelling = {normalize_label(term): term for term in order}
+        if len(spelling) < len(order):
+            # the same label written in two ways, one of them would be left out of the order
+            return None
+        return tuple(spelling.get(normalize_label(label), label) for label in self.orders[candidates[0]])
+
+    @classmethod
+    def from_file(cls, data: Union[bytes, str, BinaryIO], name: Optional[str] = None,
+                  include_known: bool = True) -> 'OrderLibrary':
+        # orders of a JSON or YAML file, a list of orders or {"orders": [...]}, searched before the known ones
+        name = name or getattr(data, 'name', data if isinstance(data, str) else '')
+        raw = read_bytes(data)
+        if str(name).endswith(('.yaml', '.yml')):
+            import yaml
+            try:
+                # every scalar stays a string, safe_load would turn labels like Yes, No or Off into booleans
+                orders = yaml.load(raw, Loader=yaml.BaseLoader)
+            except yaml.YAMLError as error:
+                raise ValueError(f'the order library {name} is not valid YAML: {error}') from error
+        else:
+            try:
+                orders = json.loads(raw)
+            except ValueError as error:
+                raise ValueError(f'the order library {name} is not valid JSON: {error}') from error
+        if isinstance(orders, dict) and 'orders' in orders:
+            orders = orders['orders']
+        if not isinstance(orders, list) or not all(isinstance(possible_order, list) for possible_order in orders):
+            raise ValueError('an order library must be a list of orders or {"orders": [...]}, '
+                             'each order a list of answer labels')
+        orders = [[str(label) for label in possible_order] for possible_order in orders]
+        return cls(orders + list(known_orders) if include_known else orders)
+
+
+default_library = OrderLibrary(known_orders)
+
+
+def check_if_order_is_known(order, library: Optional[OrderLibrary] = None):
+    return (library if library is not None else default_library).match(order)
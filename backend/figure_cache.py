@@ -0,0 +1,57 @@
+import inspect
+from typing import Any, Callable, Union
+
+import numpy as np
+import plotly.graph_objects as go
+
+from backend.cache import LRUCache
+from backend.loader import frame_fingerprint
+
+
+def normalize_argument(value: Any):
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_argument(i) for i in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, normalize_argument(val)) for key, val in value.items()))
+    if isinstance(value, np.generic):
+        return value.item()
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+class FigureCache:
+
+    def __init__(self, max_entries: int = 64):
+        self.figures = LRUCache(max_entries=max_entries)
+
+    @property
+    def hits(self) -> int:
+        return self.figures.hits
+
+    @property
+    def misses(self) -> int:
+        return self.figures.misses
+
+    def key(self, method: Callable, *args, **kwargs) -> tuple:
+        arguments = inspect.signature(method).bind(*args, **kwargs)
+        arguments.apply_defaults()
+        analyzer = method.__self__
+        # analyzers of one frame can still chart different answer counts, e.g. the groups of a faceted chart
+        counts = frame_fingerprint(analyzer.counts) if analyzer.counts is not None else None
+        return (frame_fingerprint(analyzer.df), counts, analyzer.plain_figures, method.__name__,
+                normalize_argument(tuple(arguments.arguments.items())))
+
+    def build(self, method: Callable, *args, **kwargs) -> Union[go.Figure, dict]:
+        # figures are shared between reruns, so callers must not modify the returned figure
+        key = self.key(method, *args, **kwargs)
+        fig = self.figures.get(key)
+        if fig is None:
+            fig = method(*args, **kwargs)
+            self.figures.put(key, fig)
+        return fig
+
+
+figure_cache = FigureCache()
@@ -1,12 +1,13 @@
 import pandas as pd
 import plotly.graph_objects as go
-from typing import Optional, List
+import plotly.io as pio
+from plotly.subplots import make_subplots
+from typing import Optional, List, Dict, Tuple, Union, Callable, Sequence
 import re
+from collections import Counter
+from functools import lru_cache
 import numpy as np
-from copy import deepcopy
-import statsmodels.api as sm
-from statsmodels.stats.outliers_influence import summary_table
-from math import isclose, sqrt
+from backend.loader import read_survey, read_survey_columns, split_survey
 
 pd.options.mode.chained_assignment = None
 
@@ -14,9 +15,6 @@ order = []
 
 
 class DataAnalyzer:
-    large_rockwell_template = dict(
-        layout=go.Layout(title_font=dict(family="Hevletica", size=24))
-    )
     color_2 = ["#ef4137", "#322864"]
     color_4 = ["#853565", "#f0a81b", "#5b3e97", "#ef4137"]
     color_5 = ["#a03068", "#da1c4f", "#ef4137", "#f47622", "#f0a81b"]
@@ -25,8 +23,25 @@ class DataAnalyzer:
     color_10 = ["#a7427e", "#5b3e97", "#efb91c", "#ef4137", "#da1c4f", "#e4d52e", "#85b941", "#34ab7c",
                 "#19a6b4", "#322864"]
 
-    def __init__(self, data: pd.DataFrame):
+    facet_graphs = ('create_bar_graph', 'create_bar_graph_group', 'create_pie_chart', 'create_horizontal_bar_graph')
+
+    # above this many points the scatter, line and histogram charts switch to WebGL and server-side aggregation
+    large_data_points = 10000
+    # what is sent to the browser in that mode: points per line, scatter markers and histogram bars at most
+    line_points = 2000
+    scatter_points = 100000
+    histogram_bins = 200
+
+    def __init__(self, data: pd.DataFrame, counts: Optional[pd.DataFrame] = None, plain_figures: bool = False,
+                 survey: Optional[Tuple[Dict, pd.DataFrame]] = None):
         self.df = data
+        # answer counts computed up front, e.g. for one group of a faceted chart
+        self.counts = counts
+        # multi-trace charts come back as the plain dict plotly.js reads, without graph_objects validation
+        self.plain_figures = plain_figures
+        # survey charts read the answers, the aggregate charts (numeric bar, line, scatter...) the whole frame.
+        # survey is the (questions, answers) pair of split_survey when the caller already has it
+        self.questions, self.answers = survey if survey is not None else split_survey(data)
 
     def get_palette(self, length: int):
         if length == 1:
@@ -45,34 +60,106 @@ class DataAnalyzer:
             return self.color_10[:length]
 
     @staticmethod
-    def read_data(data: str) -> pd.DataFrame:
-        df = pd.read_csv(data)
-        return df
+    def read_data(data: str, multilevel_columns: bool = False, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        if columns is not None:
+            return read_survey_columns(data, columns, multilevel_columns=multilevel_columns)
+        return read_survey(data, multilevel_columns=multilevel_columns)
 
     def show_data(self) -> pd.DataFrame:
         return self.df
 
+    def figure(self, data: List[dict], layout: dict) -> Union[go.Figure, dict]:
+        if self.plain_figures:
+            return dict(data=data, layout=dict(layout, template=layout['template'].to_plotly_json()))
+        return go.Figure(data=data, layout=layout)
+
     @staticmethod
     def capitalize_list(list_name):
         return [i.capitalize() for i in list_name]
 
     @staticmethod
-    def error_gen(actual: float, rounded: float):
-        divisor = sqrt(1.0 if actual < 1.0 else actual)
-        return abs(rounded - actual) ** 2 / divisor
-
-    def round_to_100(self, percents: np.ndarray):
-        if not isclose(sum(percents), 100):
-            raise ValueError
-        n = len(percents)
-        rounded = [int(x) for x in percents]
-        up_count = 100 - sum(rounded)
-        errors = [(self.error_gen(percents[i], rounded[i] + 1) -
-                   self.error_gen(percents[i], rounded[i]), i) for i in range(n)]
-        rank = sorted(errors)
-        for i in range(up_count):
-            rounded[rank[i][1]] += 1
-        return rounded
+    def error_gen(actual: np.ndarray, rounded: np.ndarray) -> np.ndarray:
+        divisor = np.sqrt(np.maximum(actual, 1.0))
+        return np.abs(rounded - actual) ** 2 / divisor
+
+    def round_to_100(self, percents: np.ndarray) -> np.ndarray:
+        # largest remainder rounding, one series per row when a 2-D array is passed
+        percents = np.asarray(percents, dtype=float)
+        rows = np.atleast_2d(percents)
+        totals = rows.sum(axis=1)
+        wrong = ~(np.abs(totals - 100) <= 1e-09 * np.maximum(np.abs(totals), 100))
+        if wrong.any():
+            raise ValueError(f'percentages must sum up to 100 to be rounded, got sums '
+                             f'{", ".join(str(total) for total in totals[wrong])} in rows '
+                             f'{", ".join(str(row) for row in np.flatnonzero(wrong))}. '
+                             f'Check that the order contains every option of the question.')
+        rounded = np.trunc(rows).astype(int)
+        up_count = 100 - rounded.sum(axis=1)
+        errors = self.error_gen(rows, rounded + 1) - self.error_gen(rows, rounded)
+        rank = np.empty_like(rounded)
+        np.put_along_axis(rank, np.argsort(errors, axis=1, kind='stable'), np.arange(rows.shape[1]), axis=1)
+        rounded += rank < up_count[:, None]
+        return rounded.reshape(percents.shape)
+
+    def response_frequencies(self, columns: List[str], normalize: bool = True) -> pd.DataFrame:
+        if self.counts is not None:
+            df_counts = self.counts[columns]
+            df_counts = df_counts[df_counts.sum(axis=1) > 0]
+        else:
+            # response x column contingency matrix built in a single pass over the answers block
+            counts, responses = count_answers(self.answers[columns])
+            df_counts = label_answers(pd.DataFrame(counts[0], index=responses, columns=columns))
+        if normalize:
+            df_counts = df_counts / df_counts.sum()
+        return df_counts
+
+    def group_frequencies(self, group_column: str, columns: List[str]) -> Dict[str, pd.DataFrame]:
+        group_codes, groups = pd.factorize(self.answers[group_column], sort=True)
+        counts, responses = count_answers(self.answers[columns], group_codes, len(groups))
+        return {group: label_answers(pd.DataFrame(counts[index], index=responses, columns=columns))
+                for index, group in enumerate(groups)}
+
+    def unique_answers(self, columns: List[str]) -> List[str]:
+        # labels of the answers given in the columns, in order of first appearance, as the order text lists them
+        return list(dict.fromkeys(answer_label(answer) for column in columns
+                                  for answer in self.answers[column].dropna().unique()))
+
+    def facet(self, group_column: str, graph: str, lazy: bool = False, subplots: bool = False,
+              subplot_columns: int = 2, **kwargs):
+        if graph not in self.facet_graphs:
+            raise ValueError(f'faceting supports only {", ".join(self.facet_graphs)}, got {graph}')
+        columns = list(kwargs['columns']) if graph == 'create_bar_graph_group' else [kwargs['column']]
+        group_counts = self.group_frequencies(group_column, columns)
+        # the subplots are put together from graph_objects figures
+        plain_figures = self.plain_figures and not subplots
+        survey = self.questions, self.answers.iloc[:0]
+        figures = ((group, getattr(DataAnalyzer(self.df.iloc[:1], counts=counts, plain_figures=plain_figures,
+                                                survey=survey), graph)(**kwargs))
+                   for group, counts in group_counts.items())
+        if subplots:
+            return self.combine_facets(dict(figures), subplot_columns, graph == 'create_pie_chart')
+        if lazy:
+            return figures
+        return dict(figures)
+
+    @staticmethod
+    def combine_facets(figures: Dict[str, go.Figure], subplot_columns: int, pie: bool = False) -> go.Figure:
+        subplot_columns = min(subplot_columns, max(len(figures), 1))
+        rows = -(-len(figures) // subplot_columns)
+        fig = make_subplots(rows=rows, cols=subplot_columns, subplot_titles=[str(group) for group in figures],
+                            specs=[[{'type': 'domain' if pie else 'xy'}] * subplot_columns] * rows)
+        for index, group_fig in enumerate(figures.values()):
+            for trace in group_fig.data:
+                trace.update(legendgroup=trace.name, showlegend=index == 0 and trace.showlegend is not False)
+                fig.add_trace(trace, row=index // subplot_columns + 1, col=index % subplot_columns + 1)
+        if figures:
+            layout = next(iter(figures.values())).layout
+            fig.update_layout(template=layout.template, font=layout.font, legend=layout.legend, barmode=layout.barmode,
+                              plot_bgcolor=layout.plot_bgcolor, paper_bgcolor=layout.paper_bgcolor,
+                              width=layout.width * subplot_columns if layout.width else None,
+                              height=layout.height * rows if layout.height else None)
+            fig.update_yaxes(tickformat=layout.yaxis.tickformat)
+        return fig
 
     def create_bar_graph(self, column: str, title: Optional[bool] = False, title_text: Optional[str] = None,
                          order: Optional[str] = None,
@@ -82,19 +169,10 @@ class DataAnalyzer:
                          transparent: bool = False, percents: bool = True,
                          bar_gap: Optional[float] = None, y_range: Optional[list] = None,
                          tick_distance: Optional[float] = None):
+        df_temp = self.response_frequencies([column], normalize=percents)
         if percents:
-            df_temp = pd.DataFrame(self.df.loc[1:, column].value_counts(normalize=True))
-            df_temp[column] = np.array(self.round_to_100(np.array(df_temp[column] * 100))) / 100
-        else:
-            df_temp = pd.DataFrame(self.df.loc[1:, column].value_counts())
-        new_order = order.split(',\n')
-        if new_order:
-            not_in_df = [index for index in new_order if index not in set(list(
-                df_temp.index))]
-            for i in not_in_df:
-                df_temp.loc[i, :] = [np.nan] * len(df_temp.columns)
-            df_temp = df_temp.loc[new_order,]
-        df_temp = df_temp.fillna(0).reset_index()
+            df_temp[column] = self.round_to_100(df_temp[column].to_numpy() * 100) / 100
+        df_temp = align_to_order(df_temp, order.split(',\n')).reset_index()
         x = list(df_temp['index'])
         x = [split_string(string, max_symb) for string in x]
         fig = self.plot_bar(x, list(df_temp[column]), width, height, font_size, font,
@@ -125,150 +203,81 @@ class DataAnalyzer:
         new_order = order.split(',\n')
         palette = self.get_palette(len(new_order))
         if not multilevel_columns:
-            list_vals = [self.df.loc[0, column] for column in columns]
+            list_vals = [self.questions[column] for column in columns]
             for ind, val in enumerate(list_vals):
                 if remove:
                     title_text, list_vals[ind] = re.split(' - ', list_vals[ind])
                 list_vals[ind] = split_string(list_vals[ind], max_symb)
-            fig = go.Figure()
+            df_freq = align_to_order(self.response_frequencies(columns), new_order)
+            percentages = self.round_to_100(df_freq.to_numpy().T * 100).T / 100
             dict_nums = {}
             for index, response in enumerate(new_order):
-                list_num = []
-                for column in columns:
-                    df_temp = pd.DataFrame(self.df.loc[1:, column].value_counts(
-                        normalize=True))
-                    if response not in df_temp.index:
-                        list_num.append(0)
-                    else:
-                        list_num.append(df_temp.loc[response, column])
-                dict_nums[response] = (index, list_num)
-            for val in range(len(list_vals)):
-                percentages = []
-                for key in dict_nums.keys():
-                    percentages.append(dict_nums[key][1][val])
-                percentages = np.array(self.round_to_100(np.array(percentages) * 100)) / 100
-                for ind, key in enumerate(list(dict_nums.keys())):
-                    dict_nums[key][1][val] = percentages[ind]
-            for index, response in enumerate(new_order):
-                fig.add_trace(go.Bar(x=list_vals,
-                                     y=dict_nums[response][1],
-                                     name=names[index] if names else response,
-                                     marker_color=palette[dict_nums[response][0]],
-                                     texttemplate='%{y:.0%}' if percents else '%{y:}', textposition='outside',
-                                     textfont_size=font_size
-                                     ))
+                dict_nums[response] = (index, list(percentages[index]))
+            traces = [dict(type='bar', x=list_vals,
+                           y=dict_nums[response][1],
+                           name=names[index] if names else response,
+                           marker=dict(color=palette[dict_nums[response][0]]),
+                           texttemplate='%{y:.0%}' if percents else '%{y:}', textposition='outside',
+                           textfont=dict(size=font_size))
+                      for index, response in enumerate(new_order)]
         else:
             dict_nums = {col: list(self.df[columns][col]) for col in new_order}
-            fig = go.Figure()
             col = self.df[course_col].columns[0]
             x = list(self.df[course_col][col])
             x = [split_string(string, max_symb) for string in x]
-            for index, response in enumerate(new_order):
-                fig.add_trace(go.Bar(x=x,
-                                     y=dict_nums[response],
-                                     name=names[index] if names else response,
-                                     marker_color=palette[index],
-                                     texttemplate='%{y:.0%}' if percents else '%{y:}', textposition='outside',
-                                     textfont_size=font_size
-                                     ))
-        if len(legend_position) == 2:
-            y_legend = 1 if legend_position[1] == 'top' else 0.5 if legend_position[1] == 'middle' else -0.3
-            x_legend = 1 if legend_position[0] == 'right' else 0.5 if legend_position[0] == 'center' else -0.15
-            orientation = 'h' if legend_position[0] == 'center' else 'v'
-            x_anchor = 'left'
-            y_anchor = 'top'
-
-        else:
-            y_legend = legend_position[1]
-            x_legend = legend_position[0]
-            orientation = 'v' if legend_position[4] == 'vertical' else 'h'
-            x_anchor = legend_position[2]
-            y_anchor = legend_position[3]
-        fig.update_layout(
-            font_family=font,
-            font_size=font_size,
-            title=title_text if title else '',
-            title_font_family=font,
-            title_font_size=font_size * 1.5,
-            xaxis_tickfont_size=font_size,
-            xaxis=dict(
-                title=x_title if x_title else '',
-                titlefont_size=font_size,
-                tickfont_size=font_size
-            ),
-            yaxis=dict(
-                title=y_title if y_title else '',
-                titlefont_size=font_size,
-                tickfont_size=font_size,
-                tickformat='1%' if percents else '1',
-                title_standoff=25
-            ),
-            bargap=0.15,
-            template=self.large_rockwell_template,
-            legend=dict(font_size=font_size,
-                        font_family=font,
-                        orientation=orientation,
-                        y=y_legend,
-                        x=x_legend,
-                        xanchor=x_anchor,
-                        yanchor=y_anchor),
+            traces = [dict(type='bar', x=x,
+                           y=dict_nums[response],
+                           name=names[index] if names else response,
+                           marker=dict(color=palette[index]),
+                           texttemplate='%{y:.0%}' if percents else '%{y:}', textposition='outside',
+                           textfont=dict(size=font_size))
+                      for index, response in enumerate(new_order)]
+        layout = dict(
+            title=dict(text=title_text if title else ''),
+            xaxis=dict(title=dict(text=x_title if x_title else '')),
+            yaxis=dict(title=dict(text=y_title if y_title else '', standoff=25), tickformat='1%' if percents else '1'),
+            bargap=bar_gap or 0.15,
+            template=chart_template(font, font_size, transparent, tuple(legend_position)),
             width=width, height=height
         )
-        if transparent:
-            fig.update_layout(paper_bgcolor='rgba(0,0,0,0)',
-                              plot_bgcolor='rgba(0,0,0,0)')
-        else:
-            fig.update_layout(plot_bgcolor='rgb(255,255,255)')
-        fig.update_xaxes(showline=True, linewidth=1, linecolor='black')
-        fig.update_yaxes(showline=True, linewidth=1, linecolor='black')
-        fig.update_yaxes(showgrid=False, gridwidth=1, gridcolor='lightgrey', automargin=True)
-        fig.update_xaxes(tickangle=0, automargin=True)
-
-        if bar_gap:
-            fig.update_layout(bargap=bar_gap)
         if bar_group_gap:
-            fig.update_layout(bargroupgap=bar_group_gap)
-
+            layout['bargroupgap'] = bar_group_gap
         if y_range is not None:
-            fig.update_yaxes(range=y_range)
+            layout['yaxis']['range'] = y_range
         if tick_distance is not None:
-            fig.update_yaxes(dtick=tick_distance)
+            layout['yaxis']['dtick'] = tick_distance
         if reverse_legend_order:
-            fig.update_layout(legend_traceorder="reversed")
-        return fig
+            layout['legend'] = dict(traceorder='reversed')
+        return self.figure(traces, layout)
 
     def get_categories_from_columns(self, column: str, sep: str,
                                     order: Optional[List[str]] = None) -> pd.DataFrame:
-        temp_df = self.df.copy()
-        temp_df.loc[1:, column] = [re.split(sep, str(i)) for i in temp_df.loc[1:, column]]
-        df_res = pd.DataFrame(columns=['count'])
-        responses_num = len(temp_df.loc[1:, column])
-        for index_row, tag_list in enumerate(temp_df.loc[1:, column]):
-            if type(tag_list) == str:
-                tag_list = [tag_list]
-            for index_tag, tag in enumerate(tag_list):
+        pattern = re.compile(sep)
+        answers = self.answers[column]
+        tag_counts = Counter()
+        # identical answers are split once and weighted by how often they occur
+        for answer, answer_count in answers.value_counts(sort=False, dropna=False).items():
+            prefix = ''
+            for tag in pattern.split(answer_label(answer)):
+                tag = prefix + tag
+                prefix = ''
                 if len(tag) == 1:
-                    temp_df.loc[index_row + 1, column][index_tag + 1] = tag + \
-                                                                        temp_df.loc[index_row + 1, column][
-                                                                            index_tag + 1]
+                    # a single character captured by the separator starts the next option
+                    prefix = tag
                     continue
                 tag = tag.strip()
+                if not tag:
+                    continue
                 if tag[-1] == '.':
                     tag = tag[:-1]
-                if tag in list(df_res.index):
-                    df_res.loc[tag, 'count'] += 1
-                else:
-                    df_res.loc[tag, 'count'] = 1
-        if order:
-            for string in order:
-                if string not in df_res.index:
-                    df_res.loc[string, 'count'] = 0
-        df_res = df_res.reset_index()
-        df_res = df_res[df_res['index'] != 'nan']
-        df_res['count'] = [i / responses_num for i in df_res['count']]
-        df_res['count'] = [round(i, 2) for i in df_res['count']]
-        df_res['index'] = pd.Categorical(df_res['index'], order)
-        return df_res.sort_values('index')
+                tag_counts[tag] += answer_count
+            if prefix:
+                tag_counts[prefix] += answer_count
+        df_res = pd.DataFrame({'count': pd.Series(tag_counts, dtype=float)})
+        df_res = df_res[df_res.index != 'nan']
+        df_res = align_to_order(df_res, order) if order else df_res.sort_index()
+        df_res['count'] = [round(i / len(answers), 2) for i in df_res['count']]
+        return df_res.reset_index()
 
     def create_chart_for_categories(self, column: str, title: Optional[bool] = False,
                                     title_text: Optional[str] = None, order: Optional[str] = None,
@@ -294,7 +303,6 @@ class DataAnalyzer:
                              transparent: bool = False,
                              round_nums: int = 2, legend_y_coord: float = -0.3, tick_distance: Optional[float] = None,
                              y_range: Optional[list] = None, bar_gap: Optional[float] = None):
-        fig = go.Figure()
         df = self.df
         df = df.set_index(time_col)
         palette = self.get_palette(2)
@@ -302,62 +310,30 @@ class DataAnalyzer:
         x = self.capitalize_list(x)
         x = [split_string(string, max_symb) for string in x]
         round_nums = int(round_nums)
+        traces = []
         for index, response in enumerate(['Pre-semester',
                                           'Post-semester']):
             y = [round(i, round_nums) for i in df.loc[response, :]]
-            fig.add_trace(go.Bar(x=x,
-                                 y=y,
-                                 name=response,
-                                 marker_color=palette[-index],
-                                 text=y, textposition='outside',
-                                 textfont_size=font_size
-                                 ))
-        if y_range is not None:
-            fig.update_yaxes(range=y_range)
-        if tick_distance is not None:
-            fig.update_yaxes(dtick=tick_distance)
-        fig.update_layout(
-            font_family=font,
-            font_size=font_size,
-            title=title_text if title else '',
-            title_font_family=font,
-            title_font_size=font_size * 1.5,
-            xaxis_tickfont_size=font_size,
-            xaxis=dict(
-                title=x_title if x_title else '',
-                titlefont_size=font_size,
-                tickfont_size=font_size
-            ),
-            yaxis=dict(
-                title=y_title if y_title else '',
-                titlefont_size=font_size,
-                tickfont_size=font_size,
-                tickformat="1",
-                title_standoff=25
-            ),
-            bargap=0.6,
-            template=self.large_rockwell_template,
-            legend=dict(font_size=font_size,
-                        font_family=font,
-                        orientation='h',
-                        y=float(legend_y_coord),
-                        x=0.5,
-                        xanchor='center',
-                        yanchor='top'),
+            traces.append(dict(type='bar', x=x,
+                               y=y,
+                               name=response,
+                               marker=dict(color=palette[-index]),
+                               text=y, textposition='outside',
+                               textfont=dict(size=font_size)))
+        layout = dict(
+            title=dict(text=title_text if title else ''),
+            xaxis=dict(title=dict(text=x_title if x_title else '')),
+            yaxis=dict(title=dict(text=y_title if y_title else '', standoff=25), tickformat='1'),
+            bargap=bar_gap if bar_gap is not None else 0.6,
+            template=chart_template(font, font_size, transparent),
+            legend=dict(orientation='h', y=float(legend_y_coord), x=0.5, xanchor='center', yanchor='top'),
             width=width, height=height
         )
-        if transparent:
-            fig.update_layout(paper_bgcolor='rgba(0,0,0,0)',
-                              plot_bgcolor='rgba(0,0,0,0)')
-        else:
-            fig.update_layout(plot_bgcolor='rgb(255,255,255)')
-        if bar_gap is not None:
-            fig.update_layout(bargap=bar_gap)
-        fig.update_xaxes(showline=True, linewidth=1, linecolor='black')
-        fig.update_yaxes(showline=True, linewidth=1, linecolor='black')
-        fig.update_yaxes(showgrid=False, gridwidth=1, gridcolor='lightgrey', automargin=True)
-        fig.update_xaxes(tickangle=0, automargin=True)
-        return fig
+        if y_range is not None:
+            layout['yaxis']['range'] = y_range
+        if tick_distance is not None:
+            layout['yaxis']['dtick'] = tick_distance
+        return self.figure(traces, layout)
 
     def plot_bar(self, x: list, y: list, width: int, height: int, font_size: int,
                  font: str, title: Optional[str] = None,
@@ -390,42 +366,22 @@ class DataAnalyzer:
                                  ))
 
         fig.update_layout(
-
             title=title,
-            title_font_family=font,
-            title_font_size=font_size * 1.5,
-            font_family=font,
-            font_size=font_size,
             xaxis=dict(
                 type='category',
-                title=x_title if x_title else '',
-                titlefont_size=font_size,
-                tickfont_size=font_size,
-
+                title=x_title if x_title else ''
             ),
             yaxis=dict(
                 title=y_title if y_title else '',
-                titlefont_size=font_size,
-                tickfont_size=font_size,
                 tickformat='1%' if percents else '1',
                 title_standoff=25
             ),
             bargap=0.15,  # gap between bars of adjacent location coordinates.
-            template=self.large_rockwell_template,
+            template=chart_template(font, font_size, transparent),
             width=width,
             height=height,
             showlegend=showlegend
         )
-        if transparent:
-            fig.update_layout(paper_bgcolor='rgba(0,0,0,0)',
-                              plot_bgcolor='rgba(0,0,0,0)')
-        else:
-            fig.update_layout(plot_bgcolor='rgb(255,255,255)')
-
-        fig.update_xaxes(showline=True, linewidth=1, linecolor='black')
-        fig.update_yaxes(showline=True, linewidth=1, linecolor='black')
-        fig.update_yaxes(showgrid=False, gridwidth=1, gridcolor='lightgrey', automargin=True)
-        fig.update_xaxes(tickangle=0, automargin=True)
         return fig
 
     def create_pie_chart(self, width: int, height: int, font_size: int,
@@ -440,13 +396,13 @@ class DataAnalyzer:
         new_order = order.split(',\n')
         new_order = {key: i for i, key in enumerate(new_order)}
         if column:
-            dictionary = dict(self.df.loc[1:, column].dropna().value_counts(normalize=True))
+            dictionary = dict(self.response_frequencies([column])[column])
             labels = list(dictionary.keys())
-            vals = np.array(self.round_to_100(np.array(list(dictionary.values())) * 100)) / 100
+            vals = self.round_to_100(np.array(list(dictionary.values())) * 100) / 100
         else:
             labels = list(self.df[label_column])
             nums = np.array(list(self.df[numbers_column])) / sum(np.array(list(self.df[numbers_column])))
-            vals = np.array(self.round_to_100(np.array(nums) * 100)) / 100
+            vals = self.round_to_100(np.array(nums) * 100) / 100
         labels, vals = zip(*sorted(zip(labels, vals), key=lambda d: new_order[d[0]]))
         text_temp = '%{percent:1.0%}' if what_show == 'Percent' else 'label+percent'
         palette = self.get_palette(len(labels))
@@ -458,63 +414,27 @@ class DataAnalyzer:
             fig = go.Figure(data=[go.Pie(labels=labels, values=vals,
                                          marker_colors=palette[:len(labels)],
                                          textinfo=text_temp, sort=False)])
-        if len(legend_position) == 2:
-            y_legend = 1 if legend_position[1] == 'top' else 0.5 if legend_position[1] == 'middle' else -0.3
-            x_legend = 1 if legend_position[0] == 'right' else 0.5 if legend_position[0] == 'center' else -0.15
-            orientation = 'h' if legend_position[0] == 'center' else 'v'
-            x_anchor = 'left'
-            y_anchor = 'top'
-        else:
-            y_legend = legend_position[1]
-            x_legend = legend_position[0]
-            orientation = 'v' if legend_position[4] == 'vertical' else 'h'
-            x_anchor = legend_position[2]
-            y_anchor = legend_position[3]
         fig.update_layout(
             title=title_text if title else '',
-            title_font_family=font,
-            title_font_size=font_size * 1.5,
-            font_family=font,
-            font_size=font_size,
             xaxis=dict(
-                title=x_title if x_title else '',
-                titlefont_size=font_size,
-                tickfont_size=font_size,
+                title=x_title if x_title else ''
             ),
             yaxis=dict(
                 title=y_title if y_title else '',
-                titlefont_size=font_size,
-                tickfont_size=font_size,
                 tickformat='1%',
                 title_standoff=25
             ),
             bargap=0.15,  # gap between bars of adjacent location coordinates.
-            template=self.large_rockwell_template,
+            template=chart_template(font, font_size, transparent, tuple(legend_position)),
             width=width,
-            height=height,
-            legend=dict(font_size=font_size,
-                        font_family=font,
-                        orientation=orientation,
-                        y=y_legend,
-                        x=x_legend,
-                        xanchor=x_anchor,
-                        yanchor=y_anchor),
+            height=height
         )
-        if transparent:
-            fig.update_layout(paper_bgcolor='rgba(0,0,0,0)',
-                              plot_bgcolor='rgba(0,0,0,0)')
-        else:
-            fig.update_layout(plot_bgcolor='rgb(255,255,255)')
-        fig.update_xaxes(showline=True, linewidth=1, linecolor='black')
-        fig.update_yaxes(showline=True, linewidth=1, linecolor='black')
-        fig.update_yaxes(showgrid=False, gridwidth=1, gridcolor='lightgrey', automargin=True)
-        fig.update_xaxes(tickangle=0, automargin=True)
         return fig
 
     def create_gauge_graph(self, column: str, width: int, height: int,
                            font_size: int, font: str, transparent: bool):
-        promoters = (self.df.loc[1:, column] == 'Promoter').sum() / (len(self.df) - 1)
-        detractors = (self.df.loc[1:, column] == 'Detractor').sum() / (len(self.df) - 1)
+        promoters = (self.answers[column] == 'Promoter').sum() / len(self.answers)
+        detractors = (self.answers[column] == 'Detractor').sum() / len(self.answers)
         fig = go.Figure(go.Indicator(
             mode="gauge+number",
             value=round(100 * (promoters - detractors), 1),
@@ -536,17 +456,9 @@ class DataAnalyzer:
                                     width: int = 900, height: int = 500,
                                     transparent: bool = False,
                                     font_size: int = 20, font: str = 'Hevletica Neue'):
-        new_order = order.split(',\n')
-        df_temp = pd.DataFrame(self.df.loc[1:, column].value_counts(
-            normalize=True))
-        df_temp[column] = self.round_to_100(np.array(df_temp[column] * 100))
-        if new_order:
-            not_in_df = [index for index in new_order if index not in set(list(
-                df_temp.index))]
-            for i in not_in_df:
-                df_temp.loc[i, :] = [np.nan] * len(df_temp.columns)
-            df_temp = df_temp.loc[new_order, ]
-        df_temp = df_temp.fillna(0).reset_index()
+        df_temp = self.response_frequencies([column])
+        df_temp[column] = self.round_to_100(df_temp[column].to_numpy() * 100)
+        df_temp = align_to_order(df_temp, order.split(',\n')).reset_index()
         df_temp = df_temp.sort_values(by='index', ascending=True)
         fig = go.Figure()
         annotations = []
@@ -633,17 +545,11 @@ class DataAnalyzer:
                           tick_distance: Optional[float] = None,
                           bar_gap: Optional[float] = None
                           ):
-        df = deepcopy(self.df)
         overall = sum(self.df.loc[:, column]) / len(self.df.loc[:, column])
-        new_order = order.split(',\n')
-        df = df.set_index(course_col)
-        if new_order:
-            not_in_df = [index for index in new_order if index not in set(list(
-                df.index))]
-            for i in not_in_df:
-                df.loc[i, :] = [np.nan] * len(df.columns)
-            df = df.loc[new_order, ]
-        df = df.fillna(0).reset_index()
+        # only the columns the chart shows, indexed by course
+        value_columns = list(dict.fromkeys([column] + ([err_column] if err_column is not None else [])))
+        df = self.df[[course_col] + value_columns].set_index(course_col)
+        df = align_to_order(df, order.split(',\n')).reset_index()
         x = list(df[course_col]).copy()
         x_copy = x.copy()
         x = [split_string(string, max_symb) for string in x]
@@ -690,76 +596,55 @@ class DataAnalyzer:
                   width: int = 900, height: int = 550,
                   font_size: int = 20, font: str = 'Hevletica Neue',
                   transparent: bool = False, tick_distance: Optional[float] = None,
-                  show_average: bool = False):
+                  show_average: bool = False, resample: Optional[str] = None):
+        # resample ('D', 'W', 'M' or any other pandas offset) plots the mean of every day, week or month
 
-        fig = go.Figure()
         cols = list(self.df.columns)
         cols.remove(time_col)
 
-        if show_average:
-            colors = self.get_palette(len(cols) + 1)
-        else:
-            colors = self.get_palette(len(cols))
+        # the palettes go up to 10 colors, longer panels reuse them
+        colors = self.get_palette(min(len(cols) + 1 if show_average else len(cols), 10))
+        colors = [colors[ind % len(colors)] for ind in range(len(cols) + 1)]
 
-        index = 0
+        # the time column is parsed once, every series and the average share it
+        values = self.df[cols].set_index(pd.DatetimeIndex(pd.to_datetime(self.df[time_col]), name=time_col))
+        if resample is not None:
+            values = values.resample(resample).mean()
+        large = len(values) * len(cols) > self.large_data_points
+        scatter = 'scattergl' if large else 'scatter'
+
+        traces = []
         for ind, col in enumerate(cols):
-            df_new = self.df.dropna(subset=col)
-            fig.add_trace(go.Scatter(y=df_new[col], x=pd.to_datetime(df_new[time_col]),
-                                     mode='lines+text',
-                                     name=col,
-                                     line=dict(color=colors[ind], width=4)))
-            index += 1
+            series = values[col].dropna()
+            x, y = series.index, series
+            if large:
+                x, y = min_max_downsample(x.to_numpy(), y.to_numpy(), self.line_points)
+            traces.append(dict(type=scatter, y=y, x=x,
+                               mode='lines+text',
+                               name=col,
+                               line=dict(color=colors[ind], width=4)))
         if show_average:
-            means = []
-            dates = self.df[time_col]
-            df_indexed = self.df.set_index(time_col)
-            for date in dates:
-                means.append(df_indexed.loc[date, :].mean())
-            fig.add_trace(go.Scatter(y=means, x=pd.to_datetime(self.df[time_col]),
-                                     mode='lines+text',
-                                     name='Average',
-                                     line=dict(color=colors[index], width=4, dash='dash')))
-        fig.update_layout(
-            font_family=font,
-            font_size=font_size,
-            title=title_text if title else '',
-            title_font_family=font,
-            title_font_size=font_size * 1.5,
-            xaxis_tickfont_size=font_size,
-            xaxis=dict(
-                title=x_title if x_title else '',
-                titlefont_size=font_size,
-                tickfont_size=font_size,
-                tickformat='%b, %d'
-            ),
-            yaxis=dict(
-                title=y_title if y_title else '',
-                titlefont_size=font_size,
-                tickfont_size=font_size,
-                tickformat="1",
-                title_standoff=width * 0.02
-            ),
-            template=self.large_rockwell_template,
-            legend=dict(font_size=font_size,
-                        font_family=font),
+            # mean of all series at every time, rows sharing a time are averaged first
+            means = values.groupby(level=0).mean().mean(axis=1)
+            x, y = means.index, means
+            if large:
+                x, y = min_max_downsample(x.to_numpy(), y.to_numpy(), self.line_points)
+            traces.append(dict(type=scatter, y=y, x=x,
+                               mode='lines+text',
+                               name='Average',
+                               line=dict(color=colors[len(cols)], width=4, dash='dash')))
+        layout = dict(
+            title=dict(text=title_text if title else ''),
+            xaxis=dict(title=dict(text=x_title if x_title else ''), tickformat='%b, %d'),
+            yaxis=dict(title=dict(text=y_title if y_title else '', standoff=width * 0.02), tickformat='1'),
+            template=chart_template(font, font_size, transparent),
             width=width, height=height
         )
         if y_range is not None:
-            fig.update_yaxes(range=y_range)
+            layout['yaxis']['range'] = y_range
         if tick_distance is not None:
-            fig.update_yaxes(dtick=tick_distance)
-
-        if transparent:
-            fig.update_layout(paper_bgcolor='rgba(0,0,0,0)',
-                              plot_bgcolor='rgba(0,0,0,0)')
-        else:
-            fig.update_layout(plot_bgcolor='rgb(255,255,255)')
-
-        fig.update_xaxes(showline=True, linewidth=1, linecolor='black')
-        fig.update_yaxes(showline=True, linewidth=1, linecolor='black')
-        fig.update_yaxes(showgrid=False, gridwidth=1, gridcolor='lightgrey', automargin=True)
-        fig.update_xaxes(tickangle=0, automargin=True)
-        return fig
+            layout['yaxis']['dtick'] = tick_distance
+        return self.figure(traces, layout)
 
     def plot_horizontal_bar_for_nps(self,
                                     course_col: str, column: str, title: Optional[bool] = False,
@@ -769,11 +654,7 @@ class DataAnalyzer:
                                     font_size: int = 20, font: str = 'Hevletica Neue', max_symb: int = 20,
                                     transparent: bool = False, percents: bool = True,
                                     round_nums: int = 2):
-        df = deepcopy(self.df)
-        df = df.set_index(course_col)
-        df = df.fillna(0).reset_index()
-        x = list(df[course_col]).copy()
-        x = [split_string(string, max_symb) for string in x]
+        x = [split_string(string, max_symb) for string in self.df[course_col]]
         v = self.df[column]
         fig = go.Figure()
         fig.add_trace(go.Bar(y=x, x=[round(i, int(round_nums)) for i in v],
@@ -782,41 +663,24 @@ class DataAnalyzer:
                              textfont_size=font_size, orientation='h',
                              textposition='outside'
                              ))
-        fig.update_xaxes(range=[-120, 120])
         fig.update_layout(
             title=title_text if title else '',
-            title_font_family=font,
-            title_font_size=font_size * 1.5,
-            font_family=font,
-            font_size=font_size,
             xaxis=dict(
                 title=x_title if x_title else '',
-                titlefont_size=font_size,
-                tickfont_size=font_size
+                range=[-120, 120]
             ),
             yaxis=dict(
                 title=y_title if y_title else '',
-                titlefont_size=font_size,
-                tickfont_size=font_size,
                 tickformat='1%' if percents else '1',
-                title_standoff=25
+                title_standoff=25,
+                showline=False
             ),
             bargap=0.15,  # gap between bars of adjacent location coordinates.
-            template=self.large_rockwell_template,
+            template=chart_template(font, font_size, transparent),
             width=width,
             height=height,
             barmode='relative'
         )
-        if transparent:
-            fig.update_layout(paper_bgcolor='rgba(0,0,0,0)',
-                              plot_bgcolor='rgba(0,0,0,0)')
-        else:
-            fig.update_layout(plot_bgcolor='rgb(255,255,255)')
-
-        fig.update_xaxes(showline=True, linewidth=1, linecolor='black')
-        fig.update_yaxes(showline=False, linewidth=1, linecolor='black')
-        fig.update_yaxes(showgrid=False, gridwidth=1, gridcolor='lightgrey', automargin=True)
-        fig.update_xaxes(tickangle=0, automargin=True)
         return fig
 
     def stacked_bar_plot(self, column: str, first_column: str, second_column: str,
@@ -826,80 +690,27 @@ class DataAnalyzer:
                          font_size: int = 20, font: str = 'Hevletica Neue',
                          transparent: bool = False, percents: bool = True,
                          max_symb: int = 20, legend_position: List[str] = ('bottom', 'center')):
-        fig = go.Figure()
         df = self.df
         x = list(df[column]).copy()
         x = self.capitalize_list(x)
         x = [split_string(string, max_symb) for string in x]
-        fig.add_trace(go.Bar(
-            name=first_column,
-            x=x, y=[round(i, 2) for i in df[first_column]],
-            marker_color=self.get_palette(2)[-1],
-            texttemplate='%{y}', textposition='outside', textfont_size=font_size
-        ))
-        fig.add_trace(go.Bar(
-            name=second_column,
-            x=x, y=[round(i, 2) for i in df[second_column]],
-            marker_color=self.get_palette(2)[0],
-            texttemplate='%{y}', textposition='outside', textfont_size=font_size
-        ))
-        if len(legend_position) == 2:
-            y_legend = 1 if legend_position[1] == 'top' else 0.5 if legend_position[1] == 'middle' else -0.3
-            x_legend = 1 if legend_position[0] == 'right' else 0.5 if legend_position[0] == 'center' else -0.15
-            orientation = 'h' if legend_position[0] == 'center' else 'v'
-            x_anchor = 'left'
-            y_anchor = 'top'
-        else:
-            y_legend = legend_position[1]
-            x_legend = legend_position[0]
-            orientation = 'v' if legend_position[4] == 'vertical' else 'h'
-            x_anchor = legend_position[2]
-            y_anchor = legend_position[3]
-
-        fig.update_layout(
-
-            title=title_text if title else '',
-            title_font_family=font,
-            title_font_size=font_size * 1.5,
-            font_family=font,
-            font_size=font_size,
-            xaxis=dict(
-                title=x_title if x_title else '',
-                titlefont_size=font_size,
-                tickfont_size=font_size
-            ),
-            yaxis=dict(
-                title=y_title if y_title else '',
-                titlefont_size=font_size,
-                tickfont_size=font_size,
-                tickformat='1%' if percents else '1',
-                title_standoff=25
-            ),
+        traces = [dict(type='bar', name=name,
+                       x=x, y=[round(i, 2) for i in df[name]],
+                       marker=dict(color=color),
+                       texttemplate='%{y}', textposition='outside', textfont=dict(size=font_size))
+                  for name, color in [(first_column, self.get_palette(2)[-1]), (second_column, self.get_palette(2)[0])]]
+        layout = dict(
+            title=dict(text=title_text if title else ''),
+            xaxis=dict(title=dict(text=x_title if x_title else '')),
+            yaxis=dict(title=dict(text=y_title if y_title else '', standoff=25), tickformat='1%' if percents else '1'),
             bargap=0.15,  # gap between bars of adjacent location coordinates.
-            template=self.large_rockwell_template,
+            barmode='stack',
+            template=chart_template(font, font_size, transparent, tuple(legend_position)),
             width=width,
             height=height,
-            showlegend=True,
-            legend=dict(font_size=font_size,
-                        font_family=font,
-                        orientation=orientation,
-                        y=y_legend,
-                        x=x_legend,
-                        xanchor=x_anchor,
-                        yanchor=y_anchor),
+            showlegend=True
         )
-        if transparent:
-            fig.update_layout(paper_bgcolor='rgba(0,0,0,0)',
-                              plot_bgcolor='rgba(0,0,0,0)')
-        else:
-            fig.update_layout(plot_bgcolor='rgb(255,255,255)')
-
-        fig.update_xaxes(showline=True, linewidth=1, linecolor='black')
-        fig.update_yaxes(showline=True, linewidth=1, linecolor='black')
-        fig.update_yaxes(showgrid=False, gridwidth=1, gridcolor='lightgrey', automargin=True)
-        fig.update_xaxes(tickangle=0, automargin=True)
-        fig.update_layout(barmode='stack')
-        return fig
+        return self.figure(traces, layout)
 
     def plot_histogram(self, column: str,
                        title: Optional[bool] = False, title_text: Optional[str] = None,
@@ -907,39 +718,32 @@ class DataAnalyzer:
                        width: int = 900, height: int = 550,
                        font_size: int = 20, font: str = 'Hevletica Neue',
                        transparent: bool = False):
-        fig = go.Figure(data=[go.Histogram(x=self.df[column], marker_color='rgb(222,46,37)')])
+        values = self.answers[column]
+        numbers = pd.to_numeric(values, errors='coerce')
+        if numbers.notna().sum() > values.notna().sum() / 2:
+            # numeric answers read as text, the few that are not numbers are left out
+            values = numbers
+        if len(values) > self.large_data_points:
+            # the bins are counted here, the browser only gets one bar per bin
+            x, counts, widths = histogram_bins(values, self.histogram_bins)
+            fig = go.Figure(data=[go.Bar(x=x, y=counts, width=widths, marker_color='rgb(222,46,37)')])
+            fig.update_layout(bargap=0)
+        else:
+            fig = go.Figure(data=[go.Histogram(x=values, marker_color='rgb(222,46,37)')])
         fig.update_layout(
             title=title_text if title else '',
-            title_font_family=font,
-            title_font_size=font_size * 1.5,
-            font_family=font,
-            font_size=font_size,
             xaxis=dict(
-                title=x_title if x_title else '',
-                titlefont_size=font_size,
-                tickfont_size=font_size
+                title=x_title if x_title else ''
             ),
             yaxis=dict(
                 title=y_title if y_title else '',
-                titlefont_size=font_size,
-                tickfont_size=font_size,
                 tickformat='1',
                 title_standoff=25
             ),
-            template=self.large_rockwell_template,
+            template=chart_template(font, font_size, transparent),
             width=width,
             height=height
         )
-        if transparent:
-            fig.update_layout(paper_bgcolor='rgba(0,0,0,0)',
-                              plot_bgcolor='rgba(0,0,0,0)')
-        else:
-            fig.update_layout(plot_bgcolor='rgb(255,255,255)')
-
-        fig.update_xaxes(showline=True, linewidth=1, linecolor='black')
-        fig.update_yaxes(showline=True, linewidth=1, linecolor='black')
-        fig.update_yaxes(showgrid=False, gridwidth=1, gridcolor='lightgrey', automargin=True)
-        fig.update_xaxes(tickangle=0, automargin=True)
         return fig
 
     def plot_scatter_with_regression(self, first_column: str, second_column: str,
@@ -947,20 +751,21 @@ class DataAnalyzer:
                                      x_title: Optional[str] = None, y_title: Optional[str] = None,
                                      width: int = 900, height: int = 550,
                                      font_size: int = 20, font: str = 'Hevletica Neue',
-                                     transparent: bool = False, marker_size: int = 10, marker_line_width: int = 2):
-        df = self.df
-        y = np.array([float(i) for i in df[first_column]])
-        x = np.array([float(i) for i in df[second_column]])
-        x_regr = sm.add_constant(x)
-        res = sm.OLS(y, x_regr).fit()
+                                     transparent: bool = False, marker_size: int = 10, marker_line_width: int = 2,
+                                     grid_points: int = 100):
+        y = self.df[first_column].astype(float).to_numpy()
+        x = self.df[second_column].astype(float).to_numpy()
+        grid = np.linspace(x.min(), x.max(), grid_points)
+        predicted, low, high = LinearFit.fit(x, y).band(grid, alpha=0.05)
 
-        st, data, ss2 = summary_table(res, alpha=0.05)
-        preds = pd.DataFrame.from_records(data, columns=[s.replace('\n', ' ') for s in ss2])
-        preds['displ'] = x
-        preds = preds.sort_values(by='displ')
+        large = len(x) > self.large_data_points
+        if len(x) > self.scatter_points:
+            # the line is fitted on every point, the markers are a fixed random sample of them
+            sample = np.sort(np.random.default_rng(0).choice(len(x), self.scatter_points, replace=False))
+            x, y = x[sample], y[sample]
 
         fig = go.Figure()
-        p1 = go.Scatter(**{
+        p1 = (go.Scattergl if large else go.Scatter)(**{
             'mode': 'markers', 'marker_line_width': marker_line_width, 'marker_size': marker_size,
             'marker_color': 'rgb(222,46,37)',
             'x': x,
@@ -969,8 +774,8 @@ class DataAnalyzer:
         })
         p2 = go.Scatter({
             'mode': 'lines',
-            'x': preds['displ'],
-            'y': preds['Predicted Value'],
+            'x': grid,
+            'y': predicted,
             'name': 'Regression',
             'line': {
                 'color': 'rgb(215,116,102)'
@@ -979,8 +784,8 @@ class DataAnalyzer:
         # Add a lower bound for the confidence interval, white
         p3 = go.Scatter({
             'mode': 'lines',
-            'x': preds['displ'],
-            'y': preds['Mean ci 95% low'],
+            'x': grid,
+            'y': low,
             'name': 'Lower 95% CI',
             'showlegend': False,
             'line': {
@@ -991,8 +796,8 @@ class DataAnalyzer:
         p4 = go.Scatter({
             'type': 'scatter',
             'mode': 'lines',
-            'x': preds['displ'],
-            'y': preds['Mean ci 95% upp'],
+            'x': grid,
+            'y': high,
             'name': '95% CI',
             'fill': 'tonexty',
             'line': {
@@ -1044,27 +849,216 @@ class DataAnalyzer:
         return fig
 
 
-def split_string(string, max_symb):
-    new_str_list = string.split(" ")
-    whole_str = ""
-    new_str = ""
-    end = False
-    ind = 0
-    if len(new_str_list) == 1 and len(new_str_list[0]) > max_symb:
+class LinearFit:
+    # ordinary least squares of y on x with an intercept, from the sums the closed form needs
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, slope: float, intercept: float, residual_variance: float):
+        self.x = x
+        self.y = y
+        self.slope = slope
+        self.intercept = intercept
+        self.residual_variance = residual_variance
+        self.x_mean = x.mean()
+        self.x_spread = ((x - self.x_mean) ** 2).sum()
+
+    @classmethod
+    def fit(cls, x: np.ndarray, y: np.ndarray) -> 'LinearFit':
+        x_centered = x - x.mean()
+        slope = (x_centered * (y - y.mean())).sum() / (x_centered ** 2).sum()
+        intercept = y.mean() - slope * x.mean()
+        residuals = y - (intercept + slope * x)
+        return cls(x, y, slope, intercept, (residuals ** 2).sum() / (len(x) - 2))
+
+    def band(self, grid: np.ndarray, alpha: float = 0.05) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # fitted line with the confidence interval of the mean response at the grid points
+        from scipy import stats
+        predicted = self.intercept + self.slope * grid
+        error = np.sqrt(self.residual_variance * (1 / len(self.x) + (grid - self.x_mean) ** 2 / self.x_spread))
+        margin = stats.t.ppf(1 - alpha / 2, len(self.x) - 2) * error
+        return predicted, predicted - margin, predicted + margin
+
+    def diagnostics(self):
+        # the full statsmodels results (standard errors, tests, influence) for the same fit
+        import statsmodels.api as sm
+        return sm.OLS(self.y, sm.add_constant(self.x)).fit()
+
+
+def answer_codes(answers: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    # column-major codes of a block of answers, numbered in order of first appearance like pd.factorize
+    if answers.shape[1] == 0 or not all(isinstance(dtype, pd.CategoricalDtype) for dtype in answers.dtypes):
+        return pd.factorize(answers.to_numpy().ravel(order='F'))
+    columns = [answers.iloc[:, position].array for position in range(answers.shape[1])]
+    categories = columns[0].categories
+    for column in columns[1:]:
+        categories = categories.union(column.categories, sort=False)
+    # categorical columns are already coded, only their categories have to be put in one numbering
+    codes = np.concatenate([np.where(column.codes >= 0, categories.get_indexer(column.categories)[column.codes], -1)
+                            for column in columns])
+    seen = pd.unique(codes[codes >= 0])
+    renumber = np.full(len(categories) + 1, -1)
+    renumber[seen] = np.arange(len(seen))
+    return renumber[codes], categories[seen].to_numpy()
+
+
+def count_answers(answers: pd.DataFrame, group_codes: Optional[np.ndarray] = None,
+                  groups_num: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    # group x response x column counts of a 2-D block of answers with a single np.bincount
+    rows_num, columns_num = answers.shape
+    codes, responses = answer_codes(answers)
+    cells = codes * columns_num + np.repeat(np.arange(columns_num), rows_num)
+    answered = codes >= 0
+    if group_codes is not None:
+        group_ids = np.tile(group_codes, columns_num)
+        answered &= group_ids >= 0
+        cells += group_ids * len(responses) * columns_num
+    counts = np.bincount(cells[answered], minlength=groups_num * len(responses) * columns_num)
+    return counts.reshape(groups_num, len(responses), columns_num), responses
+
+
+def answer_label(answer) -> str:
+    # numbers typed by the loader are matched against order text, a column with blanks holds 3.0 for '3'
+    if isinstance(answer, float) and answer.is_integer():
+        return str(int(answer))
+    return str(answer)
+
+
+def label_answers(counts: pd.DataFrame) -> pd.DataFrame:
+    # rows of answer counts labeled like the order text, answers with the same label are counted together
+    if pd.api.types.infer_dtype(counts.index, skipna=False) in ('string', 'empty'):
+        return counts
+    labels = pd.Index([answer_label(answer) for answer in counts.index], dtype=object)
+    if labels.is_unique:
+        return counts.set_axis(labels)
+    return counts.groupby(labels, sort=False).sum()
+
+
+def align_to_order(counts: Union[pd.Series, pd.DataFrame], order: List[str],
+                   fill_value: float = 0) -> Union[pd.Series, pd.DataFrame]:
+    # rows of counts in the given order in one reindex, options nobody chose get fill_value
+    if counts.index.is_unique:
+        return counts.reindex(order).fillna(fill_value)
+    # a label listed more than once in counts keeps all of its rows
+    missing = pd.Index(dict.fromkeys(order), dtype=object).difference(counts.index, sort=False)
+    filler = counts.iloc[:0].reindex(missing.rename(counts.index.name))
+    return pd.concat([counts, filler]).loc[order].fillna(fill_value)
+
+def min_max_downsample(x: np.ndarray, y: np.ndarray, points: int) -> Tuple[np.ndarray, np.ndarray]:
+    # a line of at most `points` points: the lowest and the highest value in each of points // 2 equal
+    # slices of the x range, so peaks and dips stay visible
+    if len(x) <= points:
+        return x, y
+    order = np.argsort(x, kind='stable')
+    x, y = x[order], y[order]
+    positions = x.view('int64') if np.issubdtype(x.dtype, np.datetime64) else x.astype(float)
+    buckets_num = max(points // 2, 1)
+    span = positions[-1] - positions[0]
+    if span > 0:
+        buckets = np.minimum(((positions - positions[0]) / span * buckets_num).astype(int), buckets_num - 1)
+    else:
+        buckets = np.zeros(len(x), dtype=int)
+    # within a bucket the points are ranked by value, the first one is the minimum and the last one the maximum
+    ranked = np.lexsort((y, buckets))
+    bounds = np.flatnonzero(np.diff(buckets)) + 1
+    keep = np.unique(np.concatenate([ranked[np.r_[0, bounds]], ranked[np.r_[bounds, len(x)] - 1]]))
+    return x[keep], y[keep]
+
+
+def histogram_bins(values: pd.Series, max_bins: int) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    # bar positions, counts and widths of a histogram of the values
+    values = values.dropna()
+    if not pd.api.types.is_numeric_dtype(values):
+        # text answers get one bar per answer, in order of first appearance like go.Histogram
+        codes, answers = pd.factorize(values)
+        counts = np.bincount(codes, minlength=len(answers))
+        if len(answers) > max_bins:
+            # free text can have an answer per respondent, only the most common ones are drawn
+            kept = np.sort(np.argsort(-counts, kind='stable')[:max_bins])
+            return answers.to_numpy()[kept], counts[kept], None
+        return answers.to_numpy(), counts, None
+    values = values.to_numpy(dtype=float)
+    if len(values) and np.all(values == np.round(values)) and values.max() - values.min() + 1 <= max_bins:
+        # whole numbers like 0-10 scores get one bar per number, as go.Histogram draws them for small data
+        edges = np.arange(values.min(), values.max() + 2) - 0.5
+    else:
+        edges = np.histogram_bin_edges(values, bins='auto')
+        if len(edges) > max_bins + 1:
+            edges = np.histogram_bin_edges(values, bins=max_bins)
+    counts, edges = np.histogram(values, bins=edges)
+    return (edges[:-1] + edges[1:]) / 2, counts, np.diff(edges)
+
+# trace types the charts are drawn with
+CHART_TRACES = ('bar', 'histogram', 'pie', 'scatter', 'scattergl')
+
+
+def legend_layout(legend_position: Sequence) -> dict:
+    # (horizontal, vertical) names like ('left', 'top'), or (x, y, xanchor, yanchor, 'vertical' / 'horizontal')
+    if len(legend_position) == 2:
+        return dict(orientation='h' if legend_position[0] == 'center' else 'v',
+                    x=1 if legend_position[0] == 'right' else 0.5 if legend_position[0] == 'center' else -0.15,
+                    y=1 if legend_position[1] == 'top' else 0.5 if legend_position[1] == 'middle' else -0.3,
+                    xanchor='left', yanchor='top')
+    return dict(orientation='v' if legend_position[4] == 'vertical' else 'h', x=legend_position[0],
+                y=legend_position[1], xanchor=legend_position[2], yanchor=legend_position[3])
+
+
+@lru_cache(maxsize=64)
+def chart_template(font: str, font_size: float, transparent: bool,
+                   legend_position: Optional[tuple] = None) -> go.layout.Template:
+    # fonts, background, axis lines and legend every chart shares, with plotly's default styles of the traces
+    # the charts draw, validated once per combination
+    background = (dict(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)') if transparent
+                  else dict(plot_bgcolor='rgb(255,255,255)'))
+    axis = dict(title_font_size=font_size, tickfont_size=font_size, showline=True, linewidth=1, linecolor='black',
+                automargin=True)
+    legend = dict(font=dict(family=font, size=font_size),
+                  **(legend_layout(legend_position) if legend_position is not None else {}))
+    default_data = pio.templates[pio.templates.default].data
+    return go.layout.Template(data={trace: default_data[trace] for trace in CHART_TRACES},
+                              layout=dict(font=dict(family=font, size=font_size),
+                                          title_font=dict(family=font, size=font_size * 1.5),
+                                          xaxis=dict(axis, tickangle=0),
+                                          yaxis=dict(axis, showgrid=False, gridwidth=1, gridcolor='lightgrey'),
+                                          legend=legend, **background))
+
+
+@lru_cache(maxsize=16)
+def text_width(font: str, font_size: float) -> Optional[Callable[[str], float]]:
+    # width in pixels of a text set in the font, families that are not installed fall back to DejaVu Sans.
+    # None without matplotlib and Pillow, which are optional, the labels are then wrapped by character count
+    try:
+        from matplotlib import font_manager
+        from PIL import ImageFont
+    except ImportError:
+        return None
+    path = font_manager.findfont(font_manager.FontProperties(family=font))
+    return ImageFont.truetype(path, max(int(round(font_size)), 1)).getlength
+
+
+@lru_cache(maxsize=8192)
+def split_string(string: str, max_symb: int, max_width: Optional[float] = None, font: str = 'Hevletica Neue',
+                 font_size: float = 20) -> str:
+    # greedy word wrap of a label into <br> separated lines of at most max_symb characters,
+    # or of at most max_width pixels in the given font when max_width is set
+    words = string.split(' ')
+    measure = text_width(font, font_size) if max_width is not None else None
+    if measure is None:
+        sizes, limit, space = [len(word) for word in words], max_symb, 1
+    else:
+        sizes, limit, space = [measure(word) for word in words], max_width, measure(' ')
+    if len(words) == 1 and sizes[0] > limit:
         return string
-    if max([len(w) for w in new_str_list]) > max_symb:
+    if max(sizes) > limit:
         raise ValueError('number of symbols is too low. Increase it.')
-    while not end:
-        if len(new_str) + len(new_str_list[ind]) <= max_symb:
-            if new_str == "":
-                new_str += new_str_list[ind]
-            else:
-                new_str = new_str + " " + new_str_list[ind]
-            ind += 1
-            if ind == len(new_str_list):
-                whole_str += new_str + '<br>'
-                end = True
+    lines, line, width = [], [], 0
+    for word, size in zip(words, sizes):
+        # the character count has never included the space before the next word, pixel widths do
+        if width + size + (space if width and measure is not None else 0) > limit:
+            lines.append(' '.join(line))
+            line, width = [], 0
+        if width:
+            line.append(word)
+            width += space + size
         else:
-            whole_str += new_str + '<br>'
-            new_str = ""
-    return whole_str
+            line, width = [word], size
+    lines.append(' '.join(line))
+    return '<br>'.join(lines) + '<br>'
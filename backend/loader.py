@@ -0,0 +1,183 @@
+import hashlib
+from io import BytesIO
+import os
+import weakref
+from functools import lru_cache
+from typing import Union, BinaryIO, List, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.cache import LRUCache
+from backend.columnar import SurveyStore
+
+
+def frame_size(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+# parsed uploads shared by every page and session of the app
+frames = LRUCache(max_entries=8, max_bytes=2 * 1024 ** 3, sizeof=frame_size)
+
+
+def read_bytes(data: Union[bytes, str, BinaryIO]) -> bytes:
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, str):
+        with open(data, 'rb') as file:
+            return file.read()
+    if hasattr(data, 'getvalue'):
+        return data.getvalue()
+    return data.read()
+
+
+def content_hash(raw: bytes) -> str:
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+# fingerprints by id of the frame object, each entry goes away with its frame. Kept outside df.attrs, which
+# pandas copies into every slice and filter of the frame
+fingerprints: Dict[int, str] = {}
+
+
+def stamp_fingerprint(df: pd.DataFrame, fingerprint: str):
+    fingerprints[id(df)] = fingerprint
+    weakref.finalize(df, fingerprints.pop, id(df), None)
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    # frames coming from the loader already carry the hash of the uploaded file
+    fingerprint = fingerprints.get(id(df))
+    if fingerprint is None:
+        rows = pd.util.hash_pandas_object(df, index=True).to_numpy()
+        fingerprint = content_hash(rows.tobytes() + repr(list(df.columns)).encode())
+        stamp_fingerprint(df, fingerprint)
+    return fingerprint
+
+
+def parse_csv(raw: bytes, multilevel_columns: bool = False) -> pd.DataFrame:
+    # low_memory=False infers each column from all its rows, chunked parsing of a big export can give ints in one
+    # chunk and strings in the next, and 0 and '0' would then be counted as different answers
+    if multilevel_columns:
+        df = pd.read_csv(BytesIO(raw), header=[0, 1], low_memory=False)
+        df.columns = df.columns.set_levels(df.columns.levels[0].str.strip(), level=0)
+        df.columns = df.columns.set_levels(df.columns.levels[1].str.strip(), level=1)
+    else:
+        df = pd.read_csv(BytesIO(raw), low_memory=False)
+        df.columns = df.columns.str.strip()
+    return df
+
+
+def split_questions(df: pd.DataFrame) -> Tuple[Dict, pd.DataFrame]:
+    # row 0 of a survey export holds the question text of every column, the answers start at row 1
+    if len(df) == 0:
+        return {}, df
+    return dict(zip(df.columns, df.iloc[0].tolist())), df.iloc[1:]
+
+
+def infer_answer_types(answers: pd.DataFrame) -> pd.DataFrame:
+    # parsed together with the question text, every column is text, without it columns of numbers become numbers
+    columns = [answers.iloc[:, position] for position in range(answers.shape[1])]
+    for position, values in enumerate(columns):
+        if values.dtype != object:
+            continue
+        try:
+            columns[position] = pd.to_numeric(values)
+        except (ValueError, TypeError):
+            # stops at the first answer that is not a number, text columns are not parsed to the end
+            continue
+    typed = pd.DataFrame(dict(enumerate(columns)), index=answers.index)
+    typed.columns = answers.columns
+    return typed
+
+
+def parts_size(parts: Tuple[Dict, pd.DataFrame]) -> int:
+    # text columns share their strings with the parsed frame, only the pointers are new
+    return int(parts[1].memory_usage(index=True).sum())
+
+
+# questions and typed answers of each survey frame by its fingerprint, so row 0 is split off once per upload
+surveys = LRUCache(max_entries=8, max_bytes=1024 ** 3, sizeof=parts_size)
+
+
+def split_survey(df: pd.DataFrame) -> Tuple[Dict, pd.DataFrame]:
+    key = frame_fingerprint(df)
+    parts = surveys.get(key)
+    if parts is None:
+        questions, answers = split_questions(df)
+        parts = questions, infer_answer_types(answers)
+        surveys.put(key, parts)
+    # callers get their own dict and frame over the cached answers, like read_survey does
+    return dict(parts[0]), parts[1].copy(deep=False)
+
+
+def categorize(df: pd.DataFrame, orders=None, max_ratio: float = 0.5) -> pd.DataFrame:
+    # low-cardinality text columns are stored as categoricals, in the order of a known scale when one fits
+    columns = [df.iloc[:, position] for position in range(df.shape[1])]
+    for position, values in enumerate(columns):
+        if values.dtype != object or len(values) < 2:
+            continue
+        codes, uniques = pd.factorize(values)
+        # row 0 holds the question text and is kept as one more category
+        answer_codes = codes[1:][codes[1:] >= 0]
+        answers = uniques[np.bincount(answer_codes, minlength=len(uniques)) > 0].tolist()
+        if not answers or len(answers) > max_ratio * len(answer_codes):
+            continue
+        if pd.to_numeric(pd.Series(answers, dtype=object), errors='coerce').notna().all():
+            # numeric answers stay as they are, the numeric charts convert them with astype(float)
+            continue
+        known = orders.match(answers) if orders is not None else None
+        categories = pd.Index(dict.fromkeys([*(known or sorted(answers)), *uniques]), dtype=object)
+        codes = np.where(codes >= 0, categories.get_indexer(uniques)[codes], -1)
+        columns[position] = pd.Categorical.from_codes(codes, categories=categories)
+    # one new frame, replacing the columns one by one would copy the block of the remaining ones every time
+    categorized = pd.DataFrame(dict(enumerate(columns)), index=df.index)
+    categorized.columns = df.columns
+    return categorized
+
+
+def read_survey(data: Union[bytes, str, BinaryIO], multilevel_columns: bool = False, categorical: bool = False,
+                orders=None) -> pd.DataFrame:
+    # with categorical=True text answers are stored as codes, orders (an OrderLibrary) sets the category order
+    raw = read_bytes(data)
+    key = (content_hash(raw), multilevel_columns)
+    if categorical:
+        key += ('categorical', content_hash(repr(orders.orders).encode()) if orders is not None else None)
+    df = frames.get(key)
+    if df is None:
+        if categorical:
+            df = categorize(read_survey(raw, multilevel_columns), orders)
+        else:
+            df = parse_csv(raw, multilevel_columns)
+        frames.put(key, df)
+    # callers may rename or add columns, so they get their own frame over the cached data
+    df = df.copy(deep=False)
+    stamp_fingerprint(df, '-'.join(map(str, key)))
+    return df
+
+
+@lru_cache(maxsize=1)
+def survey_store() -> SurveyStore:
+    return SurveyStore()
+
+
+def source_key(data: Union[bytes, str, BinaryIO]) -> str:
+    # files on disk are recognized by path, size and modification time, without reading them
+    if isinstance(data, str):
+        stat = os.stat(data)
+        return content_hash(f'{os.path.realpath(data)}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+    return content_hash(read_bytes(data))
+
+
+def read_survey_columns(data: Union[bytes, str, BinaryIO], columns: List, multilevel_columns: bool = False,
+                        categorical: bool = False, orders=None, store: SurveyStore = None) -> pd.DataFrame:
+    # only the given columns, memory-mapped from the columnar copy of the survey made on the first call
+    store = store or survey_store()
+    key = f'{source_key(data)}-{int(multilevel_columns)}'
+    if key not in store:
+        store.convert(key, parse_csv(read_bytes(data), multilevel_columns))
+    df = store.load(key, columns)
+    if categorical:
+        df = categorize(df, orders)
+    stamp_fingerprint(df, content_hash(repr((key, list(columns), categorical)).encode()))
+    return df
@@ -0,0 +1,197 @@
+import argparse
+import inspect
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from backend.default_orders import check_if_order_is_known, OrderLibrary
+from backend.graphs import DataAnalyzer
+from backend.loader import read_survey, read_survey_columns
+
+# graph type names used in Graph_Creator.py mapped to the DataAnalyzer builders
+GRAPH_TYPES = {
+    'Bar Graph for Categorical Data': 'create_bar_graph',
+    'Horizontal Bar Chart for NPS scores': 'plot_horizontal_bar_for_nps',
+    'Bar Graph for Numeric Data': 'create_simple_bar',
+    'Group Bar Graph': 'create_bar_graph_group',
+    'Multiple-Choice Question Bar Graph': 'create_chart_for_categories',
+    'Pie Chart': 'create_pie_chart',
+    'Gauge Graph': 'create_gauge_graph',
+    'Horizontal Bar Graph for single NPS score': 'create_horizontal_bar_graph',
+    'Self-Assessment Graph': 'plot_self_assessment',
+    'Line Graph': 'plot_line',
+    'Stacked Bar Graph': 'stacked_bar_plot',
+    'Scatter Graph with Regression Line': 'plot_scatter_with_regression',
+    'Histogram': 'plot_histogram',
+}
+
+# chart arguments that name columns of the survey
+COLUMN_ARGUMENTS = ('column', 'course_col', 'time_col', 'first_column', 'second_column', 'label_column',
+                    'numbers_column', 'err_column', 'facet')
+
+# GraphParams attributes that are named differently in the builders
+STYLE_ARGUMENTS = {'max_symbols': 'max_symb', 'inside_outside': 'inside_outside_pos'}
+
+DEFAULT_STYLE = dict(width=900, height=550, font_size=20, font='Helvetica Neue', transparent=False)
+
+FORMATS = ('png', 'svg', 'pdf')
+
+
+def load_spec(path: str) -> dict:
+    with open(path) as file:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml
+            spec = yaml.safe_load(file)
+        else:
+            spec = json.load(file)
+    if isinstance(spec, list):
+        spec = {'charts': spec}
+    return spec
+
+
+@lru_cache(maxsize=None)
+def load_orders(path: Optional[str]) -> Optional[OrderLibrary]:
+    return OrderLibrary.from_file(path) if path else None
+
+
+def default_order(analyzer: DataAnalyzer, method: str, chart: dict,
+                  orders: Optional[OrderLibrary] = None) -> Optional[List[str]]:
+    # the same guess Graph_Creator.py pre-fills the order text area with
+    if method in ('create_chart_for_categories', 'create_pie_chart'):
+        column = chart.get('column') or chart.get('label_column')
+        options = list(analyzer.get_categories_from_columns(column, r',(\S)')['index'])
+    elif method == 'create_bar_graph_group':
+        options = analyzer.unique_answers(chart['columns'])
+    elif method in ('create_bar_graph', 'create_horizontal_bar_graph'):
+        options = analyzer.unique_answers([chart['column']])
+    elif method == 'create_simple_bar':
+        options = list(analyzer.df[chart['course_col']].dropna().unique())
+    else:
+        return None
+    options = [str(option) for option in options]
+    return list(check_if_order_is_known(options, orders) or sorted(options))
+
+
+def chart_arguments(analyzer: DataAnalyzer, method: str, chart: dict, defaults: dict,
+                    orders: Optional[OrderLibrary] = None) -> dict:
+    chart = dict(chart)
+    style = dict(DEFAULT_STYLE, **defaults, **chart.pop('style', {}))
+    for key in ('name', 'graph', 'format', 'facet'):
+        chart.pop(key, None)
+    parameters = inspect.signature(getattr(analyzer, method)).parameters
+    arguments = {}
+    for key, value in style.items():
+        key = STYLE_ARGUMENTS.get(key, key)
+        if key in parameters:
+            arguments[key] = value
+    if style.get('title_text') and 'title' in parameters and 'title' not in style:
+        arguments['title'] = True
+    arguments.update(chart)
+    if 'order' in parameters:
+        order = arguments.get('order') or default_order(analyzer, method, chart, orders)
+        if order is not None:
+            arguments['order'] = order if isinstance(order, str) else ',\n'.join(order)
+    return arguments
+
+
+def chart_columns(method: str, chart: dict) -> Optional[List[str]]:
+    # columns a chart reads, None when it needs the whole survey
+    if method == 'plot_line':
+        return None
+    columns = list(chart.get('columns', []))
+    columns.extend(chart[key] for key in COLUMN_ARGUMENTS if chart.get(key) is not None)
+    return list(dict.fromkeys(columns))
+
+
+def start_worker():
+    # the first export starts the Kaleido renderer, which then stays alive for the whole worker process
+    go.Figure().to_image(format='png')
+
+
+def file_label(group) -> str:
+    # a group value as part of a file name: path separators and other characters file systems reject become _
+    label = re.sub(r'[^\w\-. ]+', '_', str(group)).strip(' .')
+    return label or '_'
+
+
+def render_chart(csv: str, chart: dict, defaults: dict, output: str, multilevel_columns: bool = False,
+                 scale: float = 1, orders: Optional[str] = None, columnar: bool = False) -> List[str]:
+    # returns the paths of the images written, one per group for faceted charts
+    method = GRAPH_TYPES.get(chart['graph'], chart['graph'])
+    columns = chart_columns(method, chart) if columnar else None
+    # the images are written straight from plain figure dicts, without graph_objects validation
+    if columns is None:
+        analyzer = DataAnalyzer(read_survey(csv, multilevel_columns=multilevel_columns), plain_figures=True)
+    else:
+        analyzer = DataAnalyzer(read_survey_columns(csv, columns, multilevel_columns=multilevel_columns),
+                                plain_figures=True)
+    arguments = chart_arguments(analyzer, method, chart, defaults, load_orders(orders))
+    name, image_format = os.path.splitext(output)
+    if 'facet' in chart:
+        # one image per group, e.g. per course or section of the survey
+        paths = []
+        for group, fig in analyzer.facet(chart['facet'], method, lazy=True, **arguments):
+            paths.append(f'{name}_{file_label(group)}{image_format}')
+            pio.write_image(fig, paths[-1], format=image_format[1:], scale=scale, validate=False)
+        return paths
+    pio.write_image(getattr(analyzer, method)(**arguments), output, format=image_format[1:], scale=scale,
+                    validate=False)
+    return [output]
+
+
+def plan_outputs(csvs: List[str], spec: dict, out_dir: str, image_format: str):
+    for csv in csvs:
+        course_dir = os.path.join(out_dir, os.path.splitext(os.path.basename(csv))[0])
+        os.makedirs(course_dir, exist_ok=True)
+        for index, chart in enumerate(spec['charts']):
+            name = chart.get('name', f'{index + 1:02d}_{GRAPH_TYPES.get(chart["graph"], chart["graph"])}')
+            yield csv, chart, os.path.join(course_dir, f'{name}.{chart.get("format", image_format)}')
+
+
+def render_report(csvs: List[str], spec: dict, out_dir: str, image_format: str = 'png',
+                  jobs: Optional[int] = None, multilevel_columns: bool = False, scale: float = 1,
+                  orders: Optional[str] = None, columnar: bool = False) -> List[tuple]:
+    failures = []
+    defaults = spec.get('defaults', {})
+    with ProcessPoolExecutor(max_workers=jobs, initializer=start_worker) as executor:
+        futures = {executor.submit(render_chart, csv, chart, defaults, output, multilevel_columns, scale,
+                                   orders, columnar): output
+                   for csv, chart, output in plan_outputs(csvs, spec, out_dir, image_format)}
+        for future in as_completed(futures):
+            try:
+                for path in future.result():
+                    print(path)
+            except Exception as error:
+                failures.append((futures[future], error))
+                print(f'{futures[future]}: {error!r}', file=sys.stderr)
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Render every chart of a spec file for one or more surveys.')
+    parser.add_argument('csv', nargs='+', help='survey exports to render, one report folder per file')
+    parser.add_argument('--spec', required=True, help='JSON or YAML file with the list of charts')
+    parser.add_argument('--out', default='reports', help='folder to write the images to')
+    parser.add_argument('--format', default='png', choices=FORMATS, help='image format for charts without one')
+    parser.add_argument('--jobs', type=int, default=None, help='number of worker processes (all cores by default)')
+    parser.add_argument('--scale', type=float, default=1, help='scale factor of the exported images')
+    parser.add_argument('--multilevel-columns', action='store_true', help='surveys have two header rows')
+    parser.add_argument('--columnar', action='store_true',
+                        help='load only the columns of each chart from a columnar copy of the surveys')
+    parser.add_argument('--orders', default=None, help='JSON or YAML file with more answer orders to recognize')
+    args = parser.parse_args(argv)
+    failures = render_report(args.csv, load_spec(args.spec), args.out, args.format, args.jobs,
+                             args.multilevel_columns, args.scale, args.orders,
+                             args.columnar)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
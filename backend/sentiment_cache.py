@@ -0,0 +1,107 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from importlib.metadata import version, PackageNotFoundError
+from typing import Callable, Dict, List, Tuple
+
+Scores = Tuple[float, float, float]
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'graph_creator', 'sentiment_scores.sqlite')
+
+# package whose version invalidates the stored scores of each method
+METHOD_PACKAGES = {'ASENT': 'asent', 'TextBlob': 'textblob', 'VaderSentiment': 'vaderSentiment'}
+
+
+def method_version(method: str) -> str:
+    try:
+        return version(METHOD_PACKAGES.get(method, method))
+    except PackageNotFoundError:
+        return 'unknown'
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.blake2b(' '.join(text.split()).encode(), digest_size=16).digest()
+
+
+class SentimentCache:
+    # sqlite limits the number of parameters of a single query
+    chunk_size = 500
+
+    def __init__(self, path: str = DEFAULT_PATH, max_rows: int = 2_000_000):
+        self.path = path
+        self.max_rows = max_rows
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute('''CREATE TABLE IF NOT EXISTS scores (
+                method TEXT, version TEXT, text_hash BLOB,
+                positive REAL, negative REAL, compound REAL, used REAL,
+                PRIMARY KEY (method, version, text_hash)) WITHOUT ROWID''')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS scores_used ON scores (used)')
+            # counted once here and then kept up to date by put_many, instead of a full count on every write
+            self._rows = self._connection.execute('SELECT COUNT(*) FROM scores').fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM scores').fetchone()[0]
+
+    def get_many(self, method: str, texts: List[str]) -> Dict[str, Scores]:
+        method_ver = method_version(method)
+        hashes = {text_hash(text): text for text in texts}
+        keys = list(hashes)
+        found = {}
+        now = time.time()
+        with self._lock, self._connection:
+            for i in range(0, len(keys), self.chunk_size):
+                chunk = keys[i:i + self.chunk_size]
+                rows = self._connection.execute(
+                    f'SELECT text_hash, positive, negative, compound FROM scores '
+                    f'WHERE method = ? AND version = ? AND text_hash IN ({", ".join("?" * len(chunk))})',
+                    [method, method_ver, *chunk]).fetchall()
+                for key, positive, negative, compound in rows:
+                    found[hashes[key]] = (positive, negative, compound)
+                self._connection.executemany('UPDATE scores SET used = ? WHERE method = ? AND version = ? '
+                                             'AND text_hash = ?', [(now, method, method_ver, row[0]) for row in rows])
+        return found
+
+    def put_many(self, method: str, scores: Dict[str, Scores]):
+        method_ver = method_version(method)
+        now = time.time()
+        rows = [(method, method_ver, text_hash(text), *score, now) for text, score in scores.items()]
+        with self._lock, self._connection:
+            # rowcount of the insert is the number of new rows, scores stored already are updated in place
+            inserted = self._connection.executemany('INSERT OR IGNORE INTO scores VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                                    rows).rowcount
+            if inserted < len(rows):
+                self._connection.executemany('UPDATE scores SET positive = ?, negative = ?, compound = ?, used = ? '
+                                             'WHERE method = ? AND version = ? AND text_hash = ?',
+                                             [(*row[3:], *row[:3]) for row in rows])
+            self._rows += inserted
+            if self._rows > self.max_rows:
+                # other processes may share the file, so the rows are counted for real before dropping any
+                self._rows = self._connection.execute('SELECT COUNT(*) FROM scores').fetchone()[0]
+            if self._rows > self.max_rows:
+                # drop the least recently used scores
+                self._connection.execute('DELETE FROM scores WHERE (method, version, text_hash) IN '
+                                         '(SELECT method, version, text_hash FROM scores ORDER BY used LIMIT ?)',
+                                         (self._rows - self.max_rows,))
+                self._rows = self.max_rows
+
+    def score(self, method: str, texts: List[str], scorer: Callable[[List[str]], List[Scores]]) -> List[Scores]:
+        # scores of the texts, running the scorer only on the ones that are not stored yet
+        found = self.get_many(method, texts)
+        missing = [text for text in dict.fromkeys(texts) if text not in found]
+        if missing:
+            computed = dict(zip(missing, scorer(missing)))
+            self.put_many(method, computed)
+            found.update(computed)
+        return [found[text] for text in texts]
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM scores')
+            self._rows = 0
@@ -1,107 +1,388 @@
+import numpy as np
 import pandas as pd
+import re
 import string
+from collections import Counter
+from itertools import islice
 from wordcloud import WordCloud, STOPWORDS
+from wordcloud.tokenization import score as collocation_score
 import textnets as tn
+import igraph as ig
+import plotly.graph_objects as go
+from scipy import sparse
 import spacy
-from typing import List
+import asent  # noqa: F401, registers the asent_en_v1 pipeline component
+from spacy.language import Language
+from functools import lru_cache, partial
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Callable, Tuple, Iterable, Iterator, Dict
 from textblob import TextBlob
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from backend.sentiment_cache import SentimentCache, Scores
+from backend.cache import LRUCache
+from backend.loader import frame_fingerprint, split_survey
+
+
+@lru_cache(maxsize=1)
+def asent_pipeline() -> Language:
+    # load spacy pipeline
+    nlp = spacy.blank('en')
+    nlp.add_pipe('sentencizer')
+
+    # add the rule-based sentiment model
+    nlp.add_pipe('asent_en_v1')
+    return nlp
+
+
+def asent_scores(answers: List[str], batch_size: int = 1000, n_process: int = 1) -> List[Scores]:
+    docs = asent_pipeline().pipe(answers, batch_size=batch_size, n_process=n_process)
+    return [(doc._.polarity.positive, doc._.polarity.negative, doc._.polarity.compound) for doc in docs]
+
+
+def textblob_scores(answers: List[str]) -> List[Scores]:
+    polarities = [TextBlob(answer).sentiment.polarity for answer in answers]
+    return [(max(polarity, 0.), max(-polarity, 0.), polarity) for polarity in polarities]
+
+
+@lru_cache(maxsize=1)
+def vader_analyzer() -> SentimentIntensityAnalyzer:
+    return SentimentIntensityAnalyzer()
+
+
+def vader_chunk_scores(answers: List[str]) -> List[Scores]:
+    analyzer = vader_analyzer()
+    return [(vs['pos'], vs['neg'], vs['compound']) for vs in map(analyzer.polarity_scores, answers)]
+
+
+def vader_scores(answers: List[str], n_process: int = 1, chunk_size: int = 5000) -> List[Scores]:
+    if n_process > 1 and len(answers) > chunk_size:
+        chunks = [answers[i:i + chunk_size] for i in range(0, len(answers), chunk_size)]
+        with ProcessPoolExecutor(max_workers=n_process) as executor:
+            return [scores for chunk in executor.map(vader_chunk_scores, chunks) for scores in chunk]
+    return vader_chunk_scores(answers)
+
+
+class SentimentScores:
+
+    def __init__(self, method: str, answers: List[str], scores: List[Scores], total: int):
+        self.method = method
+        self.answers = np.array(answers, dtype=object)
+        self.positive, self.negative, self.compound = np.array(scores, dtype=float).reshape(-1, 3).T
+        self.total = total
+
+    def split(self, sensitivity: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # masks of positive and negative answers along with the strength each one is ranked by
+        if self.method == 'TextBlob':
+            positive = self.compound > 1 - sensitivity
+            negative = ~positive & (self.compound < sensitivity)
+            return positive, self.compound - 0.5, negative, 0.5 - self.compound
+        positive = self.positive > sensitivity
+        negative = ~positive & (self.negative > sensitivity)
+        return positive, self.positive, negative, self.negative
+
+    def counts(self, sensitivity: float) -> Tuple[int, int]:
+        positive, _, negative, _ = self.split(sensitivity)
+        return int(positive.sum()), int(negative.sum())
+
+    def ranked(self, mask: np.ndarray, strength: np.ndarray, k: Optional[int] = None) -> List[tuple]:
+        # answers in ascending strength, ties kept in the order they first appear
+        index = np.flatnonzero(mask)
+        values = strength[index]
+        if k is not None and len(index) > k:
+            kth = np.partition(values, len(values) - k)[len(values) - k]
+            above = np.flatnonzero(values > kth)
+            ties = np.flatnonzero(values == kth)[len(above) - k:]
+            keep = np.concatenate([above, ties])
+            index, values = index[keep], values[keep]
+        order = np.lexsort((index, values))
+        return list(zip(self.answers[index[order]], values[order].tolist()))
+
+    def top(self, sensitivity: float, k: int = 5) -> Tuple[List[tuple], List[tuple]]:
+        positive, positive_strength, negative, negative_strength = self.split(sensitivity)
+        return self.ranked(positive, positive_strength, k), self.ranked(negative, negative_strength, k)
+
+    def results(self, sensitivity: float) -> Tuple[List[tuple], List[tuple], int]:
+        positive, positive_strength, negative, negative_strength = self.split(sensitivity)
+        return self.ranked(positive, positive_strength), self.ranked(negative, negative_strength), self.total
+
+
+def answer_chunks(answers: Iterable, chunk_size: int = 10000) -> Iterator[List[str]]:
+    # lists of at most chunk_size answers, skipping everything that is not text
+    answers = (answer for answer in answers if type(answer) == str)
+    while True:
+        chunk = list(islice(answers, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def merge_plurals(counts: Counter) -> Tuple[Counter, Dict[str, str]]:
+    # the same plural merge wordcloud does: "xs" is counted as "x" when both of them were seen
+    merged = Counter(counts)
+    standard_form = {word: word for word in counts}
+    for word in counts:
+        if word.endswith('s') and not word.endswith('ss') and word[:-1] in counts:
+            merged[word[:-1]] += merged.pop(word)
+            standard_form[word] = word[:-1]
+    return merged, standard_form
+
+
+class WordFrequencies:
+    word_pattern = re.compile(r"\w+")
+    punctuation = str.maketrans('', '', string.punctuation)
+
+    def __init__(self, stopwords: Iterable[str] = STOPWORDS, max_terms: int = 200000):
+        self.stopwords = {word.lower() for word in stopwords}
+        self.max_terms = max_terms
+        self.unigrams = Counter()
+        self.bigrams = Counter()
+        self.n_words = 0
+
+    @classmethod
+    def words(cls, answer: str) -> List[str]:
+        return [word for word in cls.word_pattern.findall(answer.lower().translate(cls.punctuation))
+                if not word.isdigit()]
+
+    def update(self, answers: Iterable[str]):
+        unigrams, bigrams = self.unigrams, self.bigrams
+        for answer in answers:
+            words = self.words(answer)
+            kept = [word not in self.stopwords for word in words]
+            unigrams.update(word for word, keep in zip(words, kept) if keep)
+            bigrams.update(f'{first} {second}' for first, second, keep_first, keep_second
+                           in zip(words, words[1:], kept, kept[1:]) if keep_first and keep_second)
+            self.n_words += sum(kept)
+        self.unigrams, self.bigrams = self.bounded(unigrams), self.bounded(bigrams)
+
+    def bounded(self, counts: Counter) -> Counter:
+        # forget the rarest terms once there are too many of them, the frequent ones are all a cloud shows
+        if len(counts) > self.max_terms:
+            return Counter(dict(counts.most_common(self.max_terms // 2)))
+        return counts
+
+    def frequencies(self, collocations: bool = True, collocation_threshold: int = 30) -> Dict[str, int]:
+        unigrams, standard_form = merge_plurals(self.unigrams)
+        if not collocations:
+            return dict(unigrams)
+        # wordcloud's unigrams_and_bigrams runs the same plural merge over the bigram strings, so "great labs"
+        # is counted as "great lab" when both were seen
+        bigrams, _ = merge_plurals(self.bigrams)
+        counts = Counter(unigrams)
+        for bigram, count in bigrams.items():
+            first, second = bigram.split(' ')
+            if first not in standard_form or second not in standard_form:
+                continue
+            first, second = standard_form[first], standard_form[second]
+            if collocation_score(count, unigrams[first], unigrams[second], self.n_words) > collocation_threshold:
+                # the words of a collocation are counted as part of it instead of on their own
+                counts[first] -= count
+                counts[second] -= count
+                counts[bigram] = count
+        return {word: count for word, count in counts.items() if count > 0}
+
+
+def word_frequencies(answers: Iterable, chunk_size: int = 10000, max_terms: int = 200000,
+                     collocations: bool = True) -> Dict[str, int]:
+    frequencies = WordFrequencies(max_terms=max_terms)
+    for chunk in answer_chunks(answers, chunk_size):
+        frequencies.update(chunk)
+    return frequencies.frequencies(collocations=collocations)
+
+
+class TextNetwork:
+    # term co-occurrence network with its layout already computed, so it can be cached and drawn again
+
+    def __init__(self, terms: np.ndarray, doc_counts: np.ndarray, edges: np.ndarray, weights: np.ndarray,
+                 groups: np.ndarray):
+        self.terms = terms
+        self.doc_counts = doc_counts
+        self.edges = edges
+        self.weights = weights
+        self.groups = groups
+        graph = ig.Graph(n=len(terms), edges=edges.tolist())
+        edge_weights = np.log1p(weights).tolist() if len(weights) else None
+        self.positions = np.array(graph.layout_fruchterman_reingold(weights=edge_weights).coords).reshape(-1, 2)
+        self.clusters = np.array(graph.community_multilevel(weights=edge_weights).membership)
+
+    @classmethod
+    def from_answers(cls, answers: Iterable, groups: Iterable, min_docs: int = 2, max_nodes: int = 100,
+                     top_edges: int = 5, stopwords: Iterable[str] = STOPWORDS) -> 'TextNetwork':
+        stopwords = {word.lower() for word in stopwords}
+        vocabulary = {}
+        rows, columns, group_labels = [], [], []
+        for answer, group in zip(answers, groups):
+            if type(answer) != str:
+                continue
+            ids = {vocabulary.setdefault(word, len(vocabulary))
+                   for word in WordFrequencies.words(answer) if word not in stopwords}
+            rows.extend([len(group_labels)] * len(ids))
+            columns.extend(ids)
+            group_labels.append(group)
+        # binary document-term matrix, one document per answer
+        doc_terms = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, columns)),
+                                      shape=(len(group_labels), len(vocabulary)))
+        terms = np.array(list(vocabulary), dtype=object)
+
+        # rare terms are dropped first, then only the terms used by most documents are kept
+        doc_counts = np.asarray(doc_terms.sum(axis=0)).ravel()
+        kept = np.flatnonzero(doc_counts >= min_docs)
+        if len(kept) > max_nodes:
+            kept = kept[np.argsort(-doc_counts[kept], kind='stable')[:max_nodes]]
+        doc_terms = doc_terms[:, kept]
+
+        # number of answers every pair of terms appears in together
+        weights = (doc_terms.T @ doc_terms).toarray()
+        np.fill_diagonal(weights, 0)
+        strongest = np.zeros_like(weights, dtype=bool)
+        if len(kept) > 1 and top_edges > 0:
+            k = min(top_edges, len(kept) - 1)
+            neighbours = np.argpartition(-weights, k - 1, axis=1)[:, :k]
+            np.put_along_axis(strongest, neighbours, True, axis=1)
+        strongest &= weights > 0
+        sources, targets = np.nonzero(np.triu(strongest | strongest.T))
+
+        # the group that mentions each term in the largest share of its answers
+        group_codes, group_names = pd.factorize(pd.Series(group_labels, dtype=object))
+        group_docs = sparse.csr_matrix((np.ones(len(group_codes)), (group_codes, np.arange(len(group_codes)))),
+                                       shape=(len(group_names), len(group_codes)))
+        group_counts = (group_docs @ doc_terms).toarray() / np.maximum(np.bincount(group_codes), 1)[:, None]
+        top_groups = (np.asarray(group_names, dtype=object)[group_counts.argmax(axis=0)] if len(group_names)
+                      else np.full(len(kept), None, dtype=object))
+        return cls(terms[kept], doc_counts[kept], np.column_stack([sources, targets]),
+                   weights[sources, targets], top_groups)
+
+    def figure(self, width: int = 900, height: int = 700, font_size: int = 14,
+               font: str = 'Helvetica Neue') -> go.Figure:
+        x, y = self.positions.T if len(self.positions) else (np.array([]), np.array([]))
+        edge_x = np.column_stack([x[self.edges[:, 0]], x[self.edges[:, 1]], np.full(len(self.edges), None)]).ravel()
+        edge_y = np.column_stack([y[self.edges[:, 0]], y[self.edges[:, 1]], np.full(len(self.edges), None)]).ravel()
+        sizes = 10 + 30 * np.sqrt(self.doc_counts / max(self.doc_counts.max(initial=0), 1))
+        fig = go.Figure([
+            go.Scatter(x=edge_x, y=edge_y, mode='lines', hoverinfo='skip',
+                       line=dict(width=1, color='rgba(150,150,150,0.5)')),
+            go.Scatter(x=x, y=y, mode='markers+text', text=self.terms, textposition='top center',
+                       customdata=np.column_stack([self.doc_counts, self.groups]),
+                       hovertemplate='%{text}<br>%{customdata[0]} answers<br>mostly %{customdata[1]}<extra></extra>',
+                       marker=dict(size=sizes, color=self.clusters, colorscale='Turbo', line=dict(width=0)))])
+        fig.update_layout(width=width, height=height, showlegend=False, font=dict(family=font, size=font_size),
+                          plot_bgcolor='rgb(255,255,255)', margin=dict(l=20, r=20, t=20, b=20),
+                          xaxis=dict(visible=False), yaxis=dict(visible=False))
+        return fig
+
+
+def png_bytes(image) -> bytes:
+    # encodes a word cloud or a text network plot in memory instead of going through a file
+    buffer = BytesIO()
+    if isinstance(image, WordCloud):
+        image.to_image().save(buffer, format='PNG')
+    else:
+        image.redraw()
+        image.surface.write_to_png(buffer)
+    return buffer.getvalue()
+
+
+# scores per (data, column, method) shared across reruns of the NLP page
+score_arrays = LRUCache(max_entries=16)
+
+# laid out text networks per (data, columns, pruning parameters)
+text_networks = LRUCache(max_entries=16)
 
 
 class TextAnalyser:
 
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame, score_cache: Optional[SentimentCache] = None):
         self.df = df
+        self.score_cache = score_cache
+        self.questions, self.answers = split_survey(df)
 
-    def draw_word_cloud(self, column: str, num_of_words: int):
-        df = self.df.loc[1:, :].reset_index(drop=True)
-        data = df[column]
-        s = " ".join([response.lower() for response in data if type(response) == str]
-                     ).translate(str.maketrans('', '', string.punctuation))
+    def draw_word_cloud(self, column: str, num_of_words: int, chunk_size: int = 10000):
+        frequencies = word_frequencies(self.answers[column], chunk_size=chunk_size)
         wordcloud = WordCloud(stopwords=STOPWORDS, collocations=True,
                               background_color='white',
                               width=1500,
                               height=700, max_words=num_of_words
-                              ).generate(s)
+                              ).generate_from_frequencies(frequencies)
         return wordcloud
 
-    def sentiment_analysis(self, column: int, method: str, sensitivity: float):
-        data = [r.lower() for r in self.df[column] if type(r) == str]
-        if method == "ASENT":
-            return self.asent_method(data, sensitivity)
-        elif method == "TextBlob":
-            return self.textblob_method(data, sensitivity)
-        elif method == "VaderSentiment":
-            return self.vadersentiment_method(data, sensitivity)
-
-    def asent_method(self, data: List[str], sensitivity: float):
-        # load spacy pipeline
-        nlp = spacy.blank('en')
-        nlp.add_pipe('sentencizer')
-
-        # add the rule-based sentiment model
-        nlp.add_pipe('asent_en_v1')
-
-        positives = []
-        negatives = []
-        ans = set()
-        for answer in data:
-            doc = nlp(answer)
-            if answer in ans:
-                continue
+    def word_cloud_png(self, column: str, num_of_words: int) -> bytes:
+        return png_bytes(self.draw_word_cloud(column, num_of_words))
+
+    def sentiment_analysis(self, column: int, method: str, sensitivity: float, n_process: int = 1):
+        # (positives, negatives, total) like the *_method functions return, sentiment_scores has the (answer,
+        # strength) pairs for any sensitivity
+        results = self.sentiment_scores(column, method, n_process=n_process).results(sensitivity)
+        return self.with_docs(*results) if method == 'ASENT' else results
+
+    def sentiment_scores(self, column: int, method: str, n_process: int = 1) -> SentimentScores:
+        # the scores do not depend on the sensitivity, so they are kept for every later threshold
+        key = (frame_fingerprint(self.df), column, method)
+        scores = score_arrays.get(key)
+        if scores is None:
+            data = [r.lower() for r in self.answers[column] if type(r) == str]
+            if method == "ASENT":
+                scores = self.score_data(data, method, partial(asent_scores, n_process=n_process))
+            elif method == "TextBlob":
+                scores = self.score_data(data, method, textblob_scores)
+            elif method == "VaderSentiment":
+                scores = self.score_data(data, method, partial(vader_scores, n_process=n_process))
             else:
-                ans.add(answer)
-            if doc._.polarity.positive > sensitivity:
-                positives.append((answer, doc, doc._.polarity.positive))
-            elif doc._.polarity.negative > sensitivity:
-                negatives.append((answer, doc, doc._.polarity.negative))
-        positives.sort(key=lambda i: i[2])
-        negatives.sort(key=lambda i: i[2])
-        return positives, negatives, len(data)
+                raise ValueError(f'unknown sentiment analysis method {method}')
+            score_arrays.put(key, scores)
+        return scores
+
+    def score_data(self, data: List[str], method: str,
+                   scorer: Callable[[List[str]], List[Scores]]) -> SentimentScores:
+        # every distinct answer is scored once, in the order it first appears
+        answers = list(dict.fromkeys(data))
+        if self.score_cache is None:
+            scores = scorer(answers)
+        else:
+            scores = self.score_cache.score(method, answers, scorer)
+        return SentimentScores(method, answers, scores, len(data))
+
+    @staticmethod
+    def asent_doc(answer: str):
+        return asent_pipeline()(answer)
+
+    @staticmethod
+    def with_docs(positives: List[tuple], negatives: List[tuple], total: int) -> Tuple[List[tuple], List[tuple], int]:
+        # ASENT results carry the spacy doc of each answer for asent.visualize: (answer, doc, strength)
+        docs = asent_pipeline().pipe([answer for answer, _ in positives + negatives])
+        positives = [(answer, next(docs), strength) for answer, strength in positives]
+        negatives = [(answer, next(docs), strength) for answer, strength in negatives]
+        return positives, negatives, total
+
+    def asent_method(self, data: List[str], sensitivity: float, batch_size: int = 1000, n_process: int = 1):
+        scorer = partial(asent_scores, batch_size=batch_size, n_process=n_process)
+        return self.with_docs(*self.score_data(data, 'ASENT', scorer).results(sensitivity))
 
     def textblob_method(self, data: List[str], sensitivity: float):
-        positives = []
-        negatives = []
-        ans = set()
-        higher_bound = 1 - sensitivity
-        lower_bound = sensitivity
-        for answer in data:
-            testimonial = TextBlob(answer)
-            if answer in ans:
-                continue
-            else:
-                ans.add(answer)
-            if testimonial.sentiment.polarity > higher_bound:
-                positives.append((answer, testimonial.sentiment.polarity - 0.5))
-            elif testimonial.sentiment.polarity < lower_bound:
-                negatives.append((answer, 0.5 - testimonial.sentiment.polarity))
-        positives.sort(key=lambda i: i[1])
-        negatives.sort(key=lambda i: i[1])
-        return positives, negatives, len(data)
-
-    def vadersentiment_method(self, data: List[str], sensitivity: float):
-        positives = []
-        negatives = []
-        ans = set()
-        for answer in data:
-            analyzer = SentimentIntensityAnalyzer()
-            vs = analyzer.polarity_scores(answer)
-            if answer in ans:
-                continue
-            else:
-                ans.add(answer)
-            if vs['pos'] > sensitivity:
-                positives.append((answer, vs['pos']))
-            elif vs['neg'] > sensitivity:
-                negatives.append((answer, vs['neg']))
-        positives.sort(key=lambda i: i[1])
-        negatives.sort(key=lambda i: i[1])
-        return positives, negatives, len(data)
+        return self.score_data(data, 'TextBlob', textblob_scores).results(sensitivity)
+
+    def vadersentiment_method(self, data: List[str], sensitivity: float, n_process: int = 1,
+                              chunk_size: int = 5000):
+        scorer = partial(vader_scores, n_process=n_process, chunk_size=chunk_size)
+        return self.score_data(data, 'VaderSentiment', scorer).results(sensitivity)
 
     def text_network_analysis(self, column: int, group_column: int):
-        df = self.df[[column, group_column]]
+        df = self.answers[[column, group_column]]
         df = df.set_index(group_column)
         corpus = tn.Corpus(pd.Series(df[column], dtype="string"))
         t = tn.Textnet(corpus.tokenized(), min_docs=1)
         return t.plot(label_nodes=True, show_clusters=True)
 
+    def pruned_text_network(self, column: int, group_column: int, min_docs: int = 2, max_nodes: int = 100,
+                            top_edges: int = 5) -> TextNetwork:
+        # network of the most used terms only, for columns too large for text_network_analysis
+        key = (frame_fingerprint(self.df), column, group_column, min_docs, max_nodes, top_edges)
+        network = text_networks.get(key)
+        if network is None:
+            network = TextNetwork.from_answers(self.answers[column], self.answers[group_column],
+                                               min_docs=min_docs, max_nodes=max_nodes, top_edges=top_edges)
+            text_networks.put(key, network)
+        return network
+
+    def text_network_png(self, column: int, group_column: int) -> bytes:
+        return png_bytes(self.text_network_analysis(column, group_column))
+
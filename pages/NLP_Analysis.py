@@ -1,30 +1,39 @@
 import streamlit as st
-import pandas as pd
 from backend.text_analysis import TextAnalyser
-from io import StringIO
-import matplotlib.pyplot as plt
-from PIL import Image
+from backend.loader import read_survey, frame_fingerprint
+from backend.sentiment_cache import SentimentCache
+from backend.cache import LRUCache
 import asent
 import streamlit.components.v1 as components
 
-st.set_option('deprecation.showPyplotGlobalUse', False)
+
+@st.experimental_singleton
+def open_sentiment_cache():
+    return SentimentCache()
+
+
+def cached_render(render, *args) -> bytes:
+    # images already drawn in this session are shown again without rasterizing them a second time
+    if 'render_cache' not in st.session_state:
+        st.session_state['render_cache'] = LRUCache(max_entries=16, max_bytes=64 * 1024 ** 2, sizeof=len)
+    render_cache = st.session_state['render_cache']
+    key = (frame_fingerprint(render.__self__.df), render.__name__, *args)
+    image = render_cache.get(key)
+    if image is None:
+        image = render(*args)
+        render_cache.put(key, image)
+    return image
+
+
+sentiment_cache = open_sentiment_cache()
 
 st.title("Text Analysis")
 st.write("This tool will help you to analyze text")
 st.sidebar.header("Text Analysis Parameters")
 uploaded_file = st.sidebar.file_uploader("Upload dataframe", type='csv')
 if uploaded_file:
-    # To read file as bytes:
-    bytes_data = uploaded_file.getvalue()
-
-    # To convert to a string based IO:
-    stringio = StringIO(uploaded_file.getvalue().decode("utf-8"))
-
-    # To read file as string:
-    string_data = stringio.read()
-    dataframe = pd.read_csv(uploaded_file)
-    text_analyzer = TextAnalyser(dataframe)
-    dataframe.columns = dataframe.columns.str.strip()
+    dataframe = read_survey(uploaded_file)
+    text_analyzer = TextAnalyser(dataframe, score_cache=sentiment_cache)
     with st.sidebar:
         column = st.selectbox('Select column for analysis', options=dataframe.columns)
 
@@ -35,10 +44,7 @@ if uploaded_file:
         num_of_words = st.sidebar.number_input("Maximum number of words in WordCloud",
                                                min_value=1, max_value=200, value=20)
         st.subheader("The WordCloud generated for your data:")
-        wordcloud = text_analyzer.draw_word_cloud(column, num_of_words=num_of_words)
-        plt.imshow(wordcloud)  # image show
-        plt.axis('off')  # to off the axis of x and y
-        st.pyplot()
+        st.image(cached_render(text_analyzer.word_cloud_png, column, num_of_words), use_column_width=True)
 
     elif analysis_type == "Sentiment Analysis":
         method = st.sidebar.selectbox("Select the algorithm to perform Sentiment Analysis",
@@ -51,26 +57,37 @@ if uploaded_file:
             sensitivity = st.sidebar.number_input(label="Input sensitivity to positive and negative "
                                                         "(smaller sensitivity, more sentiment)",
                                                   min_value=0.01, max_value=0.5, value=0.2)
-        positives, negatives, len_ans = text_analyzer.sentiment_analysis(column, method, sensitivity)
+        scores = text_analyzer.sentiment_scores(column, method)
+        positives_num, negatives_num = scores.counts(sensitivity)
+        positives, negatives = scores.top(sensitivity, 5)
         st.subheader('Statistics:')
-        st.write(f'Percentage of positive responses: {round((len(positives) / len_ans) * 100, 2)}%')
-        st.write(f'Percentage of negative responses: {round((len(negatives) / len_ans) * 100, 2)}%')
-        st.subheader(f'Top {len(positives[-5:])} positive responses:')
-        for ind, positive in enumerate(positives[-5:]):
+        st.write(f'Percentage of positive responses: {round((positives_num / scores.total) * 100, 2)}%')
+        st.write(f'Percentage of negative responses: {round((negatives_num / scores.total) * 100, 2)}%')
+        st.subheader(f'Top {len(positives)} positive responses:')
+        for ind, positive in enumerate(positives):
             if method == 'ASENT':
-                components.html(asent.visualize(positive[1], style="prediction"), height=100, scrolling=True)
+                components.html(asent.visualize(text_analyzer.asent_doc(positive[0]), style="prediction"),
+                                height=100, scrolling=True)
             else:
                 st.write(ind + 1, positive[0])
-        st.subheader(f'Top {len(negatives[-5:])} negative responses:')
-        for ind, negative in enumerate(negatives[-5:]):
+        st.subheader(f'Top {len(negatives)} negative responses:')
+        for ind, negative in enumerate(negatives):
             if method == 'ASENT':
-                components.html(asent.visualize(negative[1], style="prediction"), height=100, scrolling=True)
+                components.html(asent.visualize(text_analyzer.asent_doc(negative[0]), style="prediction"),
+                                height=100, scrolling=True)
             else:
                 st.write(ind + 1, negative[0])
 
     elif analysis_type == "Text Network Analysis":
         group_column = st.sidebar.selectbox('Select group column for analysis', options=dataframe.columns)
-        plot = text_analyzer.text_network_analysis(column, group_column)
-        plot.save('plot.png')
-        img = Image.open('plot.png')
-        st.image(img)
+        pruned = st.sidebar.checkbox('Only show the most used terms (for large data)', value=False)
+        if pruned:
+            min_docs = st.sidebar.number_input("Minimum number of responses a term appears in",
+                                               min_value=1, max_value=1000, value=2)
+            max_nodes = st.sidebar.number_input("Maximum number of terms", min_value=2, max_value=500, value=100)
+            top_edges = st.sidebar.number_input("Connections kept per term", min_value=1, max_value=50, value=5)
+            network = text_analyzer.pruned_text_network(column, group_column, min_docs=min_docs,
+                                                        max_nodes=max_nodes, top_edges=top_edges)
+            st.plotly_chart(network.figure(), use_container_width=True)
+        else:
+            st.image(cached_render(text_analyzer.text_network_png, column, group_column))
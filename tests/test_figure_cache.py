@@ -0,0 +1,16 @@
+import pandas as pd
+
+from backend.figure_cache import FigureCache
+from backend.graphs import DataAnalyzer
+
+
+def test_analyzers_with_different_counts_get_their_own_figures():
+    df = pd.DataFrame({'answer': ['Was it useful?', 'Yes', 'No']})
+    first = DataAnalyzer(df, counts=pd.DataFrame({'answer': [3, 1]}, index=['Yes', 'No']))
+    second = DataAnalyzer(df, counts=pd.DataFrame({'answer': [1, 3]}, index=['Yes', 'No']))
+    cache = FigureCache()
+    first_figure = cache.build(first.create_bar_graph, 'answer', order='Yes,\nNo')
+    second_figure = cache.build(second.create_bar_graph, 'answer', order='Yes,\nNo')
+    assert first_figure.data[0].y == (0.75, 0.25)
+    assert second_figure.data[0].y == (0.25, 0.75)
+    assert cache.misses == 2
@@ -0,0 +1,35 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from backend.graphs import DataAnalyzer, split_string, text_width
+
+
+def survey(answers: dict) -> pd.DataFrame:
+    # a survey export as the loader reads it, with the question text in row 0
+    return pd.DataFrame({column: [f'{column}?', *values] for column, values in answers.items()})
+
+
+def test_integer_histogram_keeps_its_bars_above_the_large_data_threshold():
+    threshold = DataAnalyzer.large_data_points
+    scores = np.random.default_rng(0).integers(0, 11, threshold + 1)
+    small = DataAnalyzer(survey({'score': scores[:threshold - 1]})).plot_histogram('score')
+    large = DataAnalyzer(survey({'score': scores})).plot_histogram('score')
+    assert small.data[0].type == 'histogram'
+    assert large.data[0].type == 'bar'
+    small_positions = np.unique(np.asarray(small.data[0].x, dtype=float))
+    np.testing.assert_array_equal(np.asarray(large.data[0].x, dtype=float), small_positions)
+    np.testing.assert_array_equal(large.data[0].width, np.ones(len(small_positions)))
+
+
+def test_pixel_wrapping_falls_back_to_characters_without_font_packages(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'PIL', None)
+    text_width.cache_clear()
+    split_string.cache_clear()
+    try:
+        wrapped = split_string('strongly agree with it', 10, max_width=40)
+    finally:
+        text_width.cache_clear()
+        split_string.cache_clear()
+    assert wrapped == split_string('strongly agree with it', 10)
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from backend.loader import parse_csv, split_survey
+
+CSV = b'score,rating,comment\nHow likely?,How good?,Why?\n1,2.5,fine\n,4,slow\n10,3,fine\n'
+
+
+def test_numeric_answers_get_numeric_dtypes():
+    questions, answers = split_survey(parse_csv(CSV))
+    assert questions == {'score': 'How likely?', 'rating': 'How good?', 'comment': 'Why?'}
+    assert pd.api.types.is_float_dtype(answers['score'])
+    assert pd.api.types.is_float_dtype(answers['rating'])
+    assert answers['comment'].dtype == object
+    assert answers['score'].tolist()[::2] == [1, 10]
+
+
+def test_whole_number_answers_without_blanks_are_integers():
+    _, answers = split_survey(parse_csv(b'score\nHow likely?\n1\n7\n10\n'))
+    assert pd.api.types.is_integer_dtype(answers['score'])
+
+
+def test_survey_is_split_once_per_frame():
+    df = parse_csv(CSV)
+    _, first = split_survey(df)
+    _, second = split_survey(df)
+    assert first is not second
+    assert np.shares_memory(first['score'].to_numpy(), second['score'].to_numpy())
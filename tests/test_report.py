@@ -0,0 +1,16 @@
+import os
+
+from backend.report import render_report
+
+CSV = 'course,answer\nWhich course?,Was it useful?\nMath/Physics,Yes\nHistory,No\nMath/Physics,No\nHistory,Yes\n'
+
+
+def test_faceted_chart_prints_the_images_it_wrote(tmp_path, capsys):
+    csv = tmp_path / 'survey.csv'
+    csv.write_text(CSV)
+    spec = {'charts': [{'graph': 'create_bar_graph', 'column': 'answer', 'order': 'Yes,\nNo', 'facet': 'course'}]}
+    failures = render_report([str(csv)], spec, str(tmp_path / 'reports'), jobs=1)
+    assert failures == []
+    printed = capsys.readouterr().out.split()
+    assert len(printed) == 2
+    assert all(os.path.exists(path) for path in printed)
@@ -0,0 +1,12 @@
+from backend.sentiment_cache import SentimentCache
+
+
+def test_put_many_keeps_at_most_max_rows():
+    cache = SentimentCache(':memory:', max_rows=3)
+    cache.put_many('VaderSentiment', {'good': (1., 0., 1.), 'bad': (0., 1., -1.)})
+    cache.put_many('VaderSentiment', {'good': (.5, 0., .5), 'fine': (.2, 0., .2)})
+    assert len(cache) == 3
+    assert cache.get_many('VaderSentiment', ['good'])['good'] == (.5, 0., .5)
+    cache.put_many('VaderSentiment', {'awful': (0., 1., -1.)})
+    assert len(cache) == 3
+    assert 'bad' not in cache.get_many('VaderSentiment', ['bad'])
@@ -0,0 +1,29 @@
+import pandas as pd
+from wordcloud import STOPWORDS, WordCloud
+
+from backend.text_analysis import TextAnalyser, word_frequencies
+
+ANSWER = ' '.join(['great labs and great lab work the great labs were fun great lab sessions'] * 15)
+
+
+def test_word_frequencies_match_wordcloud():
+    expected = WordCloud(stopwords=STOPWORDS, collocations=True).process_text(ANSWER)
+    assert word_frequencies([ANSWER]) == expected
+
+
+def test_plural_bigrams_are_merged_like_wordcloud_does():
+    frequencies = word_frequencies([ANSWER])
+    assert frequencies['great lab'] == 60
+    assert 'great labs' not in frequencies
+
+
+def test_scoring_methods_keep_their_return_shape():
+    analyser = TextAnalyser(pd.DataFrame({'comment': ['Why?', 'I loved it', 'awful stuff']}))
+    positives, negatives, total = analyser.asent_method(['i loved it', 'awful stuff'], 0.2)
+    assert total == 2
+    assert [(answer, doc.text) for answer, doc, _ in positives + negatives] == [('i loved it', 'i loved it'),
+                                                                                  ('awful stuff', 'awful stuff')]
+    positives, negatives, total = analyser.textblob_method(['i loved it', 'awful stuff'], 0.2)
+    assert [answer for answer, _ in negatives] == ['awful stuff']
+    answer, doc, _ = analyser.sentiment_analysis('comment', 'ASENT', 0.2)[0][0]
+    assert (answer, doc.text) == ('i loved it', 'i loved it')